@@ -1,20 +1,26 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, send_file
 from flask_sqlalchemy import SQLAlchemy
 from geoalchemy2 import Geometry
-from geoalchemy2.functions import ST_AsGeoJSON
 import json
-from sqlalchemy import func
+from sqlalchemy import func, text, event
+from sqlalchemy.orm import Session
 from flask_caching import Cache
 import os
 import tempfile
 import logging
+import threading
+import time
 from flask_cors import CORS
 from datetime import datetime
 import re
-import fitz  # PyMuPDF
-from model_service import get_predictor
+from data_version import DataVersionTracker, versioned_cache
+from logging_config import configure_logging, dropped_records, RowErrorAggregator
 from dotenv import load_dotenv
 
+# PyMuPDF (fitz), model_service (joblib / scikit-learn), similarity_service and
+# hotspot_service (NumPy / SciPy) are imported inside the endpoints that use them,
+# or by warm_up(), so importing this module stays cheap
+
 # Load environment variables
 load_dotenv()
 
@@ -40,10 +46,13 @@ app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER')
 app.config['PROCESSED_FOLDER'] = os.getenv('PROCESSED_FOLDER')
 app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH'))
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, os.getenv('LOG_LEVEL')),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Configure logging: records are queued and formatted/written on a background thread
+configure_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    fmt=os.getenv('LOG_FORMAT', 'json'),
+    queue_size=int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+    rate_limit_burst=int(os.getenv('LOG_RATE_LIMIT_BURST', 10)),
+    rate_limit_interval=float(os.getenv('LOG_RATE_LIMIT_INTERVAL', 60))
 )
 logger = logging.getLogger(__name__)
 
@@ -51,6 +60,20 @@ logger = logging.getLogger(__name__)
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
 
+# Opt-in request profiling; when disabled no hooks are registered at all
+profiler = None
+if os.getenv('PROFILING_ENABLED', 'false').lower() in ('true', '1', 't'):
+    from request_profiler import RequestProfiler
+    profiler = RequestProfiler(
+        profile_dir=os.getenv('PROFILE_DIR', 'profiles'),
+        admin_token=os.getenv('PROFILE_ADMIN_TOKEN'),
+        sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+        interval_ms=float(os.getenv('PROFILE_INTERVAL_MS', 5)),
+        max_files=int(os.getenv('PROFILE_MAX_FILES', 100)),
+        excluded_prefix=f"{os.getenv('API_PREFIX')}/admin"
+    )
+    profiler.init_app(app)
+
 # Define Crime model
 class Crime(db.Model):
     __tablename__ = 'crimes_data'
@@ -70,8 +93,43 @@ class Crime(db.Model):
     def __repr__(self):
         return f'<Crime {self.incident_number}>'
 
+def _fetch_data_version():
+    """Read the crimes_data version counter maintained by the database trigger."""
+    try:
+        return db.session.execute(text("SELECT version FROM crimes_data_version WHERE id = 1")).scalar()
+    except Exception:
+        db.session.rollback()
+        raise
+
+data_version = DataVersionTracker(
+    _fetch_data_version,
+    poll_interval=float(os.getenv('DATA_VERSION_POLL_INTERVAL', 5))
+)
+http_max_age = int(os.getenv('HTTP_CACHE_MAX_AGE', 60))
+
+# Writes committed through this process are visible immediately instead of after
+# the next poll. Flush-time mapper events fire before the commit, when other
+# sessions still read the old version, so the flag set on flush is only acted on
+# once the transaction has committed.
+@event.listens_for(Session, 'after_flush')
+def _mark_crimes_changed(session, flush_context):
+    if any(isinstance(obj, Crime) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['crimes_data_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_data_version(session):
+    if session.info.pop('crimes_data_changed', False):
+        data_version.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_crimes_changed(session):
+    session.info.pop('crimes_data_changed', None)
+
 # routes
 @app.route(f"{os.getenv('API_PREFIX')}/crimes", methods=['GET'])
+@versioned_cache(cache, data_version, 'crimes', max_age=http_max_age)
 def get_crimes():
     try:
         # Get query parameters for filtering
@@ -86,14 +144,7 @@ def get_crimes():
         
         # Get zoom level for clustering decision
         zoom = int(request.args.get('zoom', 12))
-        logger.info(f"Current zoom level: {zoom}")
-        
-        # Create cache key based on parameters
-        cache_key = f"crimes_{min_lng}_{min_lat}_{max_lng}_{max_lat}_{categories_param}_{zoom}"
-        cached_result = cache.get(cache_key)
-        
-        if cached_result:
-            return jsonify(cached_result)
+        logger.debug("Current zoom level: %s", zoom)
         
         # Start building query 
         if zoom >= 15:
@@ -106,7 +157,7 @@ def get_crimes():
                     func.ST_AsGeoJSON(Crime.geometry).label('geojson')
                 )
             except Exception as e:
-                logger.error(f"Error building query: {e}")
+                logger.error("Error building query: %s", e)
                 # If date is causing issues, try without it
                 query = db.session.query(
                     Crime.id, 
@@ -135,6 +186,8 @@ def get_crimes():
             
             # Format as GeoJSON
             features = []
+            date_errors = RowErrorAggregator(logger, "Error formatting date")
+            row_errors = RowErrorAggregator(logger, "Error processing crime")
             for crime in results:
                 try:
                     geom = json.loads(crime.geojson)
@@ -143,7 +196,7 @@ def get_crimes():
                     try:
                         date_str = crime.date.isoformat() if hasattr(crime, 'date') and crime.date else None
                     except (AttributeError, TypeError) as e:
-                        logger.error(f"Error formatting date: {e}")
+                        date_errors.add(e, crime.id)
                         date_str = None
                     
                     features.append({
@@ -157,11 +210,13 @@ def get_crimes():
                         }
                     })
                 except Exception as e:
-                    logger.error(f"Error processing crime {crime.id}: {e}")
+                    row_errors.add(e, crime.id)
+            date_errors.flush()
+            row_errors.flush()
         else:
             # For zoomed out views, use server-side clustering
             cluster_factor = max(0.001, 0.05 / (2 ** (zoom - 10))) if zoom > 10 else 0.05
-            logger.info(f"Using cluster factor: {cluster_factor}")
+            logger.debug("Using cluster factor: %s", cluster_factor)
             
             # ST_SnapToGrid for clustering points
             query = db.session.query(
@@ -195,6 +250,7 @@ def get_crimes():
             
             # Format as GeoJSON
             features = []
+            cluster_errors = RowErrorAggregator(logger, "Error processing cluster")
             for result in results:
                 try:
                     geom = json.loads(result.geojson)
@@ -208,7 +264,8 @@ def get_crimes():
                         }
                     })
                 except Exception as e:
-                    logger.error(f"Error processing cluster: {e}")
+                    cluster_errors.add(e)
+            cluster_errors.flush()
         
         # Create GeoJSON FeatureCollection
         result = {
@@ -216,16 +273,11 @@ def get_crimes():
             'features': features
         }
         
-        # Cache the result
-        cache.set(cache_key, result)
-        
         # Return GeoJSON FeatureCollection
         return jsonify(result)
         
     except Exception as e:
-        logger.error(f"Error in get_crimes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in get_crimes: %s", e)
         return jsonify({
             'error': str(e),
             'type': 'FeatureCollection',
@@ -234,7 +286,7 @@ def get_crimes():
 
 # route for crime categories
 @app.route(f"{os.getenv('API_PREFIX')}/categories", methods=['GET'])
-@cache.cached(timeout=int(os.getenv('CATEGORIES_CACHE_TIMEOUT', 3600)))
+@versioned_cache(cache, data_version, 'categories', max_age=http_max_age)
 def get_categories():
     try:
         # Query distinct categories with counts
@@ -248,11 +300,12 @@ def get_categories():
         
         return jsonify(categories)
     except Exception as e:
-        logger.error(f"Error in get_categories: {e}")
+        logger.error("Error in get_categories: %s", e)
         return jsonify([]), 500
 
 # route for heatmap data
 @app.route(f"{os.getenv('API_PREFIX')}/heatmap", methods=['GET'])
+@versioned_cache(cache, data_version, 'heatmap', max_age=http_max_age)
 def get_heatmap_data():
     try:
         # Get query parameters for filtering
@@ -265,13 +318,6 @@ def get_heatmap_data():
         max_lng = request.args.get('max_lng')
         max_lat = request.args.get('max_lat')
         
-        # Create cache key
-        cache_key = f"heatmap_{min_lng}_{min_lat}_{max_lng}_{max_lat}_{categories_param}"
-        cached_result = cache.get(cache_key)
-        
-        if cached_result:
-            return jsonify(cached_result)
-        
         # Build a simpler query for heatmap points to avoid potential errors
         query = db.session.query(
             Crime.geometry
@@ -292,7 +338,7 @@ def get_heatmap_data():
                     )
                 )
             except Exception as e:
-                logger.error(f"Error creating bounding box: {e}")
+                logger.error("Error creating bounding box: %s", e)
                 # Continue without the bounding box filter
         
         # Limit the number of points to prevent browser overload
@@ -303,6 +349,7 @@ def get_heatmap_data():
         
         # Format for heatmap - Leaflet.heat expects [lat, lng, intensity]
         heatmap_data = []
+        point_errors = RowErrorAggregator(logger, "Error processing heatmap point")
         for point in results:
             try:
                 # Extract coordinates from WKB geometry
@@ -316,23 +363,19 @@ def get_heatmap_data():
                 # Add to heatmap data with default intensity of 1
                 heatmap_data.append([lat, lng, 1])
             except Exception as e:
-                logger.error(f"Error processing heatmap point: {e}")
+                point_errors.add(e)
                 continue
+        point_errors.flush()
         
-        logger.info(f"Generated {len(heatmap_data)} heatmap points")
-        
-        # Cache the result
-        cache.set(cache_key, heatmap_data)
+        logger.debug("Generated %d heatmap points", len(heatmap_data))
         
         return jsonify(heatmap_data)
     except Exception as e:
-        import traceback
-        logger.error(f"Error in get_heatmap_data: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error in get_heatmap_data: %s", e)
         return jsonify([]), 500
 
 @app.route(f"{os.getenv('API_PREFIX')}/stats", methods=['GET'])
-@cache.cached(timeout=int(os.getenv('STATS_CACHE_TIMEOUT', 3600)))
+@versioned_cache(cache, data_version, 'stats', max_age=http_max_age)
 def get_stats():
     try:
         # Get total count - no limits here
@@ -350,7 +393,119 @@ def get_stats():
             'top_categories': [{'name': cat[0], 'count': cat[1]} for cat in top_categories if cat[0]]
         })
     except Exception as e:
-        logger.error(f"Error in get_stats: {e}")
+        logger.error("Error in get_stats: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+def _load_hotspot_rows(min_id=None):
+    """Stream (id, category, lng, lat) rows for the hotspot engine, optionally only ids above min_id."""
+    with app.app_context():
+        query = db.session.query(
+            Crime.id, Crime.category, func.ST_X(Crime.geometry), func.ST_Y(Crime.geometry)
+        )
+        if min_id is not None:
+            query = query.filter(Crime.id > min_id)
+        for row in query.yield_per(50000):
+            yield tuple(row)
+        db.session.remove()
+
+def _count_hotspot_rows():
+    with app.app_context():
+        try:
+            return db.session.query(func.count(Crime.id)).scalar()
+        finally:
+            db.session.remove()
+
+def _current_data_version():
+    with app.app_context():
+        try:
+            return data_version.get()
+        finally:
+            db.session.remove()
+
+def _crimes_mutation_count():
+    """Number of UPDATE / DELETE / TRUNCATE statements run on crimes_data, or None if not tracked."""
+    with app.app_context():
+        try:
+            return db.session.execute(text("SELECT mutation_count FROM crimes_data_version WHERE id = 1")).scalar()
+        except Exception:
+            return None
+        finally:
+            db.session.remove()
+
+_hotspot_worker = None
+_hotspot_worker_lock = threading.Lock()
+
+def _get_hotspot_worker():
+    """Create the hotspot worker on first use."""
+    global _hotspot_worker
+    if _hotspot_worker is None:
+        with _hotspot_worker_lock:
+            if _hotspot_worker is None:
+                from hotspot_service import HotspotEngine, HotspotWorker
+                bounds = os.getenv('HOTSPOT_BOUNDS')
+                _hotspot_worker = HotspotWorker(
+                    HotspotEngine(
+                        cell_size_m=float(os.getenv('HOTSPOT_CELL_SIZE_M', 100)),
+                        bandwidth_m=float(os.getenv('HOTSPOT_BANDWIDTH_M', 250)),
+                        eps_m=float(os.getenv('HOTSPOT_EPS_M', 150)),
+                        min_points=int(os.getenv('HOTSPOT_MIN_POINTS', 100)),
+                        bounds=tuple(float(value) for value in bounds.split(',')) if bounds else None,
+                        bounds_percentile=float(os.getenv('HOTSPOT_BOUNDS_PERCENTILE', 0.1)),
+                        max_grid_cells=int(os.getenv('HOTSPOT_MAX_GRID_CELLS', 4000000))
+                    ),
+                    get_version=_current_data_version,
+                    load_all=_load_hotspot_rows,
+                    load_since=_load_hotspot_rows,
+                    count_rows=_count_hotspot_rows,
+                    get_mutation_count=_crimes_mutation_count,
+                    interval=float(os.getenv('HOTSPOT_REFRESH_INTERVAL', 30))
+                )
+    return _hotspot_worker
+
+# route for precomputed hotspot surfaces
+@app.route(f"{os.getenv('API_PREFIX')}/hotspots", methods=['GET'])
+def get_hotspots():
+    try:
+        category = request.args.get('category') or None
+        kind = request.args.get('kind', 'raster')
+        if kind not in ('raster', 'polygons'):
+            return jsonify({'error': "kind must be 'raster' or 'polygons'"}), 400
+        
+        # Get bounding box parameters
+        bbox = None
+        bbox_params = [request.args.get(name) for name in ('min_lng', 'min_lat', 'max_lng', 'max_lat')]
+        if all(bbox_params):
+            try:
+                bbox = tuple(float(value) for value in bbox_params)
+            except ValueError:
+                return jsonify({'error': 'Invalid bounding box'}), 400
+        
+        # Rasters are capped at HOTSPOT_MAX_CELLS per side; clients may only ask for less
+        max_cells_limit = int(os.getenv('HOTSPOT_MAX_CELLS', 256))
+        try:
+            max_cells = int(request.args.get('max_cells', max_cells_limit))
+        except ValueError:
+            return jsonify({'error': 'max_cells must be an integer'}), 400
+        max_cells = max(1, min(max_cells, max_cells_limit))
+        
+        hotspot_worker = _get_hotspot_worker()
+        if not hotspot_worker.ready:
+            hotspot_worker.start()
+            if hotspot_worker.last_error is not None:
+                return jsonify({'status': 'failed', 'error': hotspot_worker.last_error}), 503
+            return jsonify({'status': 'computing'}), 202
+        
+        engine = hotspot_worker.engine
+        result = engine.query(category, bbox, kind=kind, max_cells=max_cells)
+        if result is None:
+            return jsonify({'error': f'No hotspot surface for category: {category}'}), 404
+        
+        result['category'] = category
+        result['data_version'] = engine.data_version
+        result['updated_at'] = datetime.fromtimestamp(engine.updated_at).isoformat() if engine.updated_at else None
+        return jsonify(result)
+    except Exception as e:
+        logger.exception("Error in get_hotspots: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # Add health check endpoint
@@ -362,10 +517,12 @@ def health_check():
         return jsonify({
             'status': 'ok',
             'database': 'connected' if db_check else 'disconnected',
+            'warmup': _warmup_state,
+            'log_records_dropped': dropped_records(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         return jsonify({
             'status': 'error',
             'error': str(e),
@@ -393,20 +550,21 @@ def extract_report_data():
         temp_fd, temp_path = tempfile.mkstemp(suffix='.pdf')
         os.close(temp_fd)  # Close the file descriptor
         
-        logger.info(f"Saving uploaded file to temporary location: {temp_path}")
+        logger.debug("Saving uploaded file to temporary location: %s", temp_path)
         
         # Save the file to the temporary location
         try:
             file.save(temp_path)
-            logger.info(f"Successfully saved file to: {temp_path}")
+            logger.debug("Successfully saved file to: %s", temp_path)
         except Exception as e:
-            logger.error(f"Failed to save file: {e}")
+            logger.error("Failed to save file: %s", e)
             return jsonify({'error': f'Could not save uploaded file: {str(e)}'}), 500
         
-        logger.info(f"Processing PDF report: {file.filename}")
+        logger.info("Processing PDF report: %s", file.filename)
         
         try:
             # Extract text using PyMuPDF
+            import fitz
             doc = fitz.open(temp_path)
             text = ""
             
@@ -422,7 +580,7 @@ def extract_report_data():
             text = re.sub(r'\s+', ' ', text)  # Replace multiple spaces with a single space
             text = re.sub(r'(\n\s*)+', '\n\n', text)  # Normalize line breaks
             
-            logger.info(f"Extracted {len(text)} characters of text from PDF")
+            logger.debug("Extracted %d characters of text from PDF", len(text))
             
             # Extract coordinates using improved regex patterns
             coord_patterns = [
@@ -444,7 +602,7 @@ def extract_report_data():
                 if coord_match:
                     latitude = coord_match.group(1)
                     longitude = coord_match.group(2)
-                    logger.info(f"Found coordinates: {latitude}, {longitude} using pattern: {pattern}")
+                    logger.debug("Found coordinates: %s, %s using pattern: %s", latitude, longitude, pattern)
                     break
             
             # Extract detailed description sections with improved patterns for handling indented multiline descriptions
@@ -462,7 +620,7 @@ def extract_report_data():
                 description = re.sub(r'\n\s+', ' ', raw_desc)
                 # Clean up multiple spaces
                 description = re.sub(r'\s+', ' ', description)
-                logger.info(f"Found detailed description with specific format, length: {len(description)}")
+                logger.debug("Found detailed description with specific format, length: %d", len(description))
             
             # If not found, try other patterns
             if not description:
@@ -484,12 +642,12 @@ def extract_report_data():
                         # Clean up the description - replace line breaks with spaces, remove multiple spaces
                         description = re.sub(r'\s*\n\s*', ' ', description)
                         description = re.sub(r'\s+', ' ', description)
-                        logger.info(f"Found description of length {len(description)} using pattern: {pattern}")
+                        logger.debug("Found description of length %d using pattern: %s", len(description), pattern)
                         break
             
             # If no description was found using patterns, try to find the longest paragraph
             if not description:
-                logger.info("No description found with patterns, searching for longest paragraph")
+                logger.debug("No description found with patterns, searching for longest paragraph")
                 # Try different paragraph splitting strategies
                 potential_paragraphs = []
                 
@@ -503,13 +661,13 @@ def extract_report_data():
                     if any(keyword in p.lower() for keyword in crime_keywords):
                         # This paragraph has crime-related keywords - prioritize it
                         description = p
-                        logger.info(f"Found paragraph with crime keywords: {description[:50]}...")
+                        logger.debug("Found paragraph with crime keywords (length %d)", len(description))
                         break
                 
                 # If still no description, just use the longest paragraph
                 if not description and potential_paragraphs:
                     description = max(potential_paragraphs, key=len)
-                    logger.info(f"Using longest paragraph of length {len(description)}")
+                    logger.debug("Using longest paragraph of length %d", len(description))
                 
                 # Clean up the description
                 if description:
@@ -532,7 +690,7 @@ def extract_report_data():
                     if header_match:
                         # Cut the description before this header
                         cut_point = header_match.start()
-                        logger.info(f"Trimming description at section header: {header} (at position {cut_point})")
+                        logger.debug("Trimming description at section header: %s (at position %d)", header, cut_point)
                         description = description[:cut_point].strip()
                 
                 # Find sentences that appear to be ending the descriptive content
@@ -541,7 +699,7 @@ def extract_report_data():
                     if marker.lower() in description.lower():
                         end_idx = description.lower().find(marker.lower()) + 1  # +1 to include the period
                         description = description[:end_idx].strip()
-                        logger.info(f"Trimmed description at marker: {marker}")
+                        logger.debug("Trimmed description at marker: %s", marker)
                         break
             
             # Close the document
@@ -549,7 +707,7 @@ def extract_report_data():
             
             # If no data was extracted, return an error
             if not latitude and not longitude and not description:
-                logger.warning(f"No data extracted from PDF")
+                logger.warning("No data extracted from PDF")
                 return jsonify({
                     'error': 'Could not extract coordinates or description from the PDF. Please ensure the PDF contains the required information.'
                 }), 400
@@ -564,25 +722,72 @@ def extract_report_data():
             }
             
         except Exception as e:
-            logger.error(f"Error extracting text from PDF: {e}")
+            logger.error("Error extracting text from PDF: %s", e)
             return jsonify({'error': f'Error extracting data from PDF: {str(e)}'}), 500
         finally:
             # Clean up temporary file in finally block to ensure it happens
             try:
                 if os.path.exists(temp_path):
                     os.remove(temp_path)
-                    logger.info(f"Removed temporary file: {temp_path}")
+                    logger.debug("Removed temporary file: %s", temp_path)
             except Exception as e:
-                logger.warning(f"Could not remove temporary file {temp_path}: {e}")
+                logger.warning("Could not remove temporary file %s: %s", temp_path, e)
         
         return jsonify(extracted_data)
         
     except Exception as e:
-        logger.error(f"Error processing report: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing report: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def _profiles_guard():
+    """Error response for the profile admin endpoints, or None if the request may proceed."""
+    if profiler is None:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not profiler.is_admin_request():
+        return jsonify({'error': 'Admin token required'}), 403
+    return None
+
+# routes for recorded request profiles
+@app.route(f"{os.getenv('API_PREFIX')}/admin/profiles", methods=['GET'])
+def list_profiles():
+    error = _profiles_guard()
+    if error:
+        return error
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    # No more than PROFILE_MAX_FILES profiles are kept on disk anyway
+    return jsonify(profiler.list_profiles(max(1, min(limit, profiler.max_files))))
+
+@app.route(f"{os.getenv('API_PREFIX')}/admin/profiles/<profile_id>", methods=['GET'])
+def get_profile(profile_id):
+    error = _profiles_guard()
+    if error:
+        return error
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    # Open the downloaded file at https://www.speedscope.app
+    return send_file(os.path.abspath(path), mimetype='application/json', as_attachment=True,
+                     download_name=os.path.basename(path))
+
+@app.route(f"{os.getenv('API_PREFIX')}/admin/profiles/<profile_id>/meta", methods=['GET'])
+def get_profile_meta(profile_id):
+    error = _profiles_guard()
+    if error:
+        return error
+    path = profiler.profile_path(profile_id, meta=True)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    with open(path) as f:
+        return jsonify(json.load(f))
+
+def _get_predictor(model_path=None):
+    """Import the model service and load the predictor on first use."""
+    from model_service import get_predictor
+    return get_predictor(model_path or os.getenv('MODEL_PATH', '/app/crime_category_prediction_model.pkl'))
+
 @app.route(f"{os.getenv('API_PREFIX')}/predict-category", methods=['POST'])
 def predict_category():
     try:
@@ -596,7 +801,7 @@ def predict_category():
         if not description or not isinstance(description, str):
             return jsonify({'error': 'Invalid description format', 'success': False}), 400
         
-        logger.info(f"Predicting category for description (length: {len(description)})")
+        logger.debug("Predicting category for description (length: %d)", len(description))
         
         # Get predictor and make prediction
         try:
@@ -606,50 +811,214 @@ def predict_category():
             if model_exists:
                 model_size = os.path.getsize(model_path)
                 model_abs_path = os.path.abspath(model_path)
-                logger.info(f"Model file details - Exists: {model_exists}, Size: {model_size} bytes, Path: {model_abs_path}")
+                logger.debug("Model file details - Exists: %s, Size: %d bytes, Path: %s", model_exists, model_size, model_abs_path)
             else:
-                logger.error(f"Model file does not exist at path: {os.path.abspath(model_path)}")
+                logger.error("Model file does not exist at path: %s", os.path.abspath(model_path))
                 return jsonify({
                     'error': f'Model file not found at {os.path.abspath(model_path)}',
                     'success': False
                 }), 500
             
-            predictor = get_predictor(model_path)
+            predictor = _get_predictor(model_path)
             result = predictor.predict_category(description)
             
             # Check if prediction was successful
             if 'error' in result and result.get('category') is None:
-                logger.error(f"Prediction failed: {result.get('error')}")
+                logger.error("Prediction failed: %s", result.get('error'))
                 return jsonify({
                     'error': f"Prediction failed: {result.get('error')}",
                     'success': False
                 }), 500
             
             # Return prediction result
-            logger.info(f"Prediction successful: {result.get('category')} with confidence {result.get('confidence')}")
+            logger.info("Prediction successful: %s with confidence %s", result.get('category'), result.get('confidence'),
+                        extra={'category': result.get('category'), 'confidence': result.get('confidence')})
             return jsonify({
                 'success': True,
                 'category': result.get('category'),
                 'confidence': result.get('confidence')
             })
         except Exception as e:
-            logger.error(f"Error in prediction process: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("Error in prediction process: %s", e)
             return jsonify({
                 'error': f'Prediction failed: {str(e)}',
                 'success': False
             }), 500
             
     except Exception as e:
-        logger.error(f"Error processing prediction request: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing prediction request: %s", e)
+        return jsonify({'error': str(e), 'success': False}), 500
+
+def _load_similarity_rows():
+    """Stream (id, category, description) rows for the similarity index build."""
+    with app.app_context():
+        query = db.session.query(Crime.id, Crime.category, Crime.description).yield_per(50000)
+        for row in query:
+            yield row.id, row.category, row.description
+        db.session.remove()
+
+@app.route(f"{os.getenv('API_PREFIX')}/similar-incidents", methods=['POST'])
+def get_similar_incidents():
+    try:
+        if not request.json:
+            return jsonify({'error': 'No request body provided', 'success': False}), 400
+        
+        # Validate coordinates
+        try:
+            latitude = float(request.json.get('latitude'))
+            longitude = float(request.json.get('longitude'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Valid latitude and longitude are required', 'success': False}), 400
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({'error': 'Coordinates out of range', 'success': False}), 400
+        
+        description = request.json.get('description') or ''
+        if not isinstance(description, str):
+            return jsonify({'error': 'Invalid description format', 'success': False}), 400
+        
+        # Number of incidents to return
+        try:
+            k = int(request.json.get('k', os.getenv('SIMILAR_INCIDENTS_DEFAULT_K', 10)))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k must be an integer', 'success': False}), 400
+        k = max(1, min(k, int(os.getenv('SIMILAR_INCIDENTS_MAX_K', 50))))
+        
+        predictor = _get_predictor()
+        
+        # Use the category from the client if it already ran predict-category, otherwise predict it here
+        category = request.json.get('category')
+        if not category:
+            if not description:
+                return jsonify({'error': 'A category or description is required', 'success': False}), 400
+            prediction = predictor.predict_category(description)
+            category = prediction.get('category')
+            if not category:
+                return jsonify({
+                    'error': f"Prediction failed: {prediction.get('error')}",
+                    'success': False
+                }), 500
+        
+        candidate_limit = k * int(os.getenv('SIMILAR_CANDIDATE_FACTOR', 5))
+        distance_scale_m = float(os.getenv('SIMILAR_DISTANCE_SCALE_M', 500))
+        text_weight = float(os.getenv('SIMILAR_TEXT_WEIGHT', 0.5))
+        
+        point = func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326)
+        columns = (
+            Crime.id,
+            Crime.category,
+            Crime.date,
+            Crime.description,
+            func.ST_AsGeoJSON(Crime.geometry).label('geojson'),
+            func.ST_DistanceSphere(Crime.geometry, point).label('distance_m')
+        )
+        
+        # Spatial candidates: KNN ordering with <-> so PostGIS walks the GiST index
+        # instead of sorting the whole category by distance
+        spatial_rows = db.session.query(*columns).filter(
+            Crime.category == category
+        ).order_by(
+            Crime.geometry.distance_centroid(point)
+        ).limit(candidate_limit).all()
+        rows = {row.id: row for row in spatial_rows}
+        
+        # Text candidates from the precomputed TF-IDF index
+        text_scores = {}
+        from similarity_service import (
+            get_text_vectorizer, get_similarity_index, build_similarity_index_async,
+            is_similarity_index_building, combine_scores
+        )
+        index = get_similarity_index()
+        current_version = data_version.get()
+        if (index is None or index.data_version != current_version) and not is_similarity_index_building():
+            # Rebuild in the background, at most once per interval; a stale index
+            # keeps serving until the new one is ready
+            vectorizer = get_text_vectorizer(getattr(predictor, 'model', None))
+            min_interval = float(os.getenv('SIMILAR_INDEX_MIN_REBUILD_INTERVAL', 900))
+            if vectorizer is not None and build_similarity_index_async(
+                    vectorizer, _load_similarity_rows, current_version, min_interval):
+                logger.info("Started background build of the similarity index at data version %s", current_version)
+        if index is not None and description:
+            scored = index.score(description, category)
+            if scored is not None:
+                text_neighbours = dict(index.top_k(scored, candidate_limit))
+                missing_ids = [crime_id for crime_id in text_neighbours if crime_id not in rows]
+                if missing_ids:
+                    for row in db.session.query(*columns).filter(Crime.id.in_(missing_ids)).all():
+                        rows[row.id] = row
+                text_scores = index.lookup(scored, rows.keys())
+        
+        scores = combine_scores(
+            {crime_id: row.distance_m for crime_id, row in rows.items()},
+            text_scores,
+            distance_scale_m,
+            text_weight if text_scores else 0.0
+        )
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        
+        incidents = []
+        for crime_id, score in ranked:
+            row = rows[crime_id]
+            incidents.append({
+                'type': 'Feature',
+                'geometry': json.loads(row.geojson),
+                'properties': {
+                    'id': row.id,
+                    'category': row.category,
+                    'date': row.date.isoformat() if row.date else None,
+                    'description': row.description,
+                    'distance_m': round(float(row.distance_m), 1),
+                    'text_similarity': round(text_scores[crime_id], 4) if crime_id in text_scores else None,
+                    'score': round(score, 4)
+                }
+            })
+        
+        return jsonify({
+            'success': True,
+            'category': category,
+            'text_index_ready': index is not None,
+            'type': 'FeatureCollection',
+            'features': incidents
+        })
+        
+    except Exception as e:
+        logger.exception("Error finding similar incidents: %s", e)
         return jsonify({'error': str(e), 'success': False}), 500
 
+_warmup_state = {'status': 'pending', 'seconds': None}
+
+def warm_up():
+    """Import and initialize the heavy subsystems before their endpoints are first used."""
+    _warmup_state['status'] = 'running'
+    started = time.perf_counter()
+    try:
+        import fitz  # noqa: F401
+        _get_predictor()
+        _get_hotspot_worker().start()
+        _warmup_state['status'] = 'done'
+    except Exception as e:
+        logger.error("Warm-up failed: %s", e)
+        _warmup_state['status'] = 'failed'
+    _warmup_state['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info("Warm-up %s in %ss", _warmup_state['status'], _warmup_state['seconds'])
+
+def start_warm_up():
+    """Run warm-up according to WARMUP_MODE: background (default), blocking or off."""
+    mode = os.getenv('WARMUP_MODE', 'background').lower()
+    if mode == 'blocking':
+        warm_up()
+    elif mode == 'background':
+        # Serve health checks and light endpoints while the heavy parts load
+        threading.Thread(target=warm_up, name='warmup', daemon=True).start()
+    else:
+        _warmup_state['status'] = 'off'
+
 if __name__ == '__main__':
+    debug = os.getenv('DEBUG').lower() in ('true', '1', 't')
+    # With the debug reloader, only warm up the child process that serves requests
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_up()
     app.run(
         host='0.0.0.0',
-        debug=os.getenv('DEBUG').lower() in ('true', '1', 't'),
+        debug=debug,
         port=int(os.getenv('PORT'))
     )
\ No newline at end of file
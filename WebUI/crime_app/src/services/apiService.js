@@ -83,6 +83,26 @@ const apiService = {
     }
   },
   
+  /**
+   * Get precomputed hotspot density raster or polygons from the server
+   * @param {Object} params - category, kind ('raster' | 'polygons'), bounding box and max_cells
+   * @returns {Promise} - Promise with the hotspot data, or { status: 'computing' } while it is being built
+   */
+  getHotspots: async (params = {}) => {
+    try {
+      if (!apiAvailable && Date.now() - lastErrorTime < ERROR_COOLDOWN) {
+        throw new Error('Server unavailable. Please check if the backend server is running.');
+      }
+      
+      const response = await axios.get(`${API_BASE_URL}/hotspots`, { params });
+      apiAvailable = true;
+      return response.data;
+    } catch (error) {
+      handleApiError('Error fetching hotspot data:', error);
+      return null;
+    }
+  },
+  
   /**
    * Get crime categories from the server
    * @returns {Promise} - Promise with categories array
@@ -190,6 +210,31 @@ const apiService = {
     }
   },
 
+  /**
+   * Find historical incidents similar to an analyzed report
+   * @param {Object} params - latitude, longitude, description and optional category / k
+   * @returns {Promise} - Promise with a GeoJSON FeatureCollection of similar incidents
+   */
+  getSimilarIncidents: async (params) => {
+    try {
+      if (!apiAvailable && Date.now() - lastErrorTime < ERROR_COOLDOWN) {
+        throw new Error('Server unavailable. Please check if the backend server is running.');
+      }
+      
+      const response = await axios.post(`${API_BASE_URL}/similar-incidents`, params);
+      
+      apiAvailable = true;
+      return response.data;
+    } catch (error) {
+      handleApiError('Error fetching similar incidents:', error);
+      return {
+        success: false,
+        type: 'FeatureCollection',
+        features: []
+      };
+    }
+  },
+
 };
 
 /**
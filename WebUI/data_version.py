@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import threading
+import time
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import request, make_response
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DataVersionTracker:
+    """
+    Process-local view of the crimes_data version counter.
+
+    The counter itself lives in the database and is bumped by a trigger on every
+    write to crimes_data. It is re-read at most once per `poll_interval` seconds,
+    so conditional requests inside that window are answered without touching the
+    database. Writes made through this process call invalidate() to force a
+    re-read on the next request.
+
+    When the counter table is missing (databases created before it was added)
+    the version is None. No process-local substitute is used, since each worker
+    would then hand out different ETags for the same data.
+    """
+
+    def __init__(self, fetch_version: Callable[[], Optional[int]], poll_interval: float = 5.0):
+        self.fetch_version = fetch_version
+        self.poll_interval = poll_interval
+        self._version = None
+        self._checked_at: Optional[float] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[str]:
+        """Return the current data version, or None if it is unavailable, refreshing it if the poll interval has passed."""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.poll_interval:
+            return self._version
+
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.poll_interval:
+                return self._version
+            generation = self._generation
+            try:
+                version = self.fetch_version()
+                self._version = str(version) if version is not None else None
+            except Exception as e:
+                logger.warning("Could not read data version, serving without ETags: %s", e)
+                self._version = None
+            # A commit that landed while reading may not be in the value just read
+            if generation == self._generation:
+                self._checked_at = now
+            return self._version
+
+    def invalidate(self) -> None:
+        """Force the next get() to re-read the version from the database."""
+        self._generation += 1
+        self._checked_at = None
+
+
+def _request_fingerprint() -> str:
+    """Stable fingerprint of the request path and query parameters."""
+    args = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    return hashlib.sha1(f"{request.path}?{args}".encode('utf-8')).hexdigest()[:16]
+
+
+def versioned_cache(cache, tracker: DataVersionTracker, prefix: str, max_age: int = 60):
+    """
+    Decorator for read-only endpoints whose body depends only on crimes_data and the query string.
+
+    - Responses carry a strong ETag derived from the data version and request parameters.
+    - A matching If-None-Match is answered with 304 before the view runs, so no
+      query or serialization happens.
+    - Serialized bodies are cached under version-scoped keys, so a new version
+      simply stops hitting the old keys; the cache timeout only has to evict them.
+    - Without a data version the view is cached for `max_age` seconds and served
+      without an ETag.
+
+    Args:
+        cache: The Flask-Caching instance
+        tracker: The data version tracker
+        prefix: Cache key prefix for the endpoint
+        max_age: Cache-Control max-age in seconds for browsers and reverse proxies
+    """
+    cache_control = f"public, max-age={max_age}, must-revalidate"
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = tracker.get()
+            fingerprint = _request_fingerprint()
+            if version is None:
+                cache_key = f"{prefix}_unversioned_{fingerprint}"
+                body = cache.get(cache_key)
+                if body is not None:
+                    return make_response(body, 200, {'Content-Type': 'application/json'})
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    cache.set(cache_key, response.get_data(), timeout=max_age)
+                return response
+
+            etag = f"{version}-{fingerprint}"
+
+            # If-None-Match uses the weak comparison (RFC 7232 section 3.2), so ETags
+            # weakened by a compressing reverse proxy still revalidate
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                cache_key = f"{prefix}_v{version}_{fingerprint}"
+                body = cache.get(cache_key)
+                if body is not None:
+                    response = make_response(body, 200, {'Content-Type': 'application/json'})
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    # Only successful responses are cacheable; errors fall through untouched
+                    if response.status_code != 200:
+                        return response
+                    cache.set(cache_key, response.get_data())
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
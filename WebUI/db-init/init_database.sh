@@ -79,4 +79,46 @@ else
     echo "Database already contains data, skipping restore."
 fi
 
+# Spatial indexes used by the map and similar-incident queries.
+# The composite (category, geometry) GiST index lets "<->" KNN ordering stay
+# index-assisted when the search is restricted to a single category.
+echo "Ensuring spatial indexes exist..."
+PGPASSWORD=1234 psql -h localhost -U postgres -d crime_app <<'SQL' || echo "WARNING: Could not create spatial indexes."
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+CREATE INDEX IF NOT EXISTS idx_crimes_data_geometry ON crimes_data USING gist (geometry);
+CREATE INDEX IF NOT EXISTS idx_crimes_data_category_geometry ON crimes_data USING gist (category, geometry);
+ANALYZE crimes_data;
+SQL
+
+# Data version counter read by the backend for cache keys and ETags.
+# A statement-level trigger bumps it on any write to crimes_data. Inserts and
+# other writes (UPDATE / DELETE / TRUNCATE) are also counted separately, so
+# derived data can tell pure appends from changes to existing rows.
+echo "Ensuring data version counter exists..."
+PGPASSWORD=1234 psql -h localhost -U postgres -d crime_app <<'SQL' || echo "WARNING: Could not create data version counter."
+CREATE TABLE IF NOT EXISTS crimes_data_version (
+    id integer PRIMARY KEY CHECK (id = 1),
+    version bigint NOT NULL DEFAULT 1
+);
+ALTER TABLE crimes_data_version ADD COLUMN IF NOT EXISTS insert_count bigint NOT NULL DEFAULT 0;
+ALTER TABLE crimes_data_version ADD COLUMN IF NOT EXISTS mutation_count bigint NOT NULL DEFAULT 0;
+INSERT INTO crimes_data_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_crimes_data_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE crimes_data_version SET
+        version = version + 1,
+        insert_count = insert_count + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE 0 END,
+        mutation_count = mutation_count + CASE WHEN TG_OP = 'INSERT' THEN 0 ELSE 1 END
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS crimes_data_version_bump ON crimes_data;
+CREATE TRIGGER crimes_data_version_bump
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON crimes_data
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_crimes_data_version();
+SQL
+
 echo "Database initialization script completed."
\ No newline at end of file
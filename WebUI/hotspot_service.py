@@ -0,0 +1,452 @@
+import logging
+import math
+import threading
+import time
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import ndimage, signal
+from scipy.spatial import ConvexHull
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE = 111320.0
+ALL_CATEGORIES = '__all__'
+
+
+class HotspotGrid:
+    """Fixed lon/lat grid the density surfaces are computed on."""
+
+    def __init__(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float, cell_size_m: float):
+        mid_lat = math.radians((min_lat + max_lat) / 2)
+        self.cell_size_m = cell_size_m
+        self.cell_lat = cell_size_m / METERS_PER_DEGREE
+        self.cell_lng = cell_size_m / (METERS_PER_DEGREE * max(math.cos(mid_lat), 1e-6))
+        self.min_lng = min_lng
+        self.min_lat = min_lat
+        self.width = max(1, int(math.ceil((max_lng - min_lng) / self.cell_lng)))
+        self.height = max(1, int(math.ceil((max_lat - min_lat) / self.cell_lat)))
+        self.max_lng = min_lng + self.width * self.cell_lng
+        self.max_lat = min_lat + self.height * self.cell_lat
+
+    @classmethod
+    def from_points(cls, lngs: np.ndarray, lats: np.ndarray, cell_size_m: float, padding_cells: int,
+                    bounds: Optional[Tuple[float, float, float, float]] = None,
+                    percentile: float = 0.1, max_cells: Optional[int] = None):
+        """
+        Build a grid covering the points plus a margin so kernels are not clipped at the edges.
+
+        Args:
+            lngs: Point longitudes
+            lats: Point latitudes
+            cell_size_m: Cell edge length in metres
+            padding_cells: Margin added on every side, in cells
+            bounds: Fixed (min_lng, min_lat, max_lng, max_lat) extent. When omitted the
+                    extent spans the `percentile`..(100 - `percentile`) range of the points,
+                    so a few mis-geocoded outliers cannot stretch the grid.
+            percentile: Percentile trimmed from each side when no bounds are given
+            max_cells: Largest allowed width * height
+
+        Raises:
+            ValueError: If the grid would have more than max_cells cells
+        """
+        if bounds is not None:
+            min_lng, min_lat, max_lng, max_lat = bounds
+        else:
+            min_lng, max_lng = np.percentile(lngs, [percentile, 100 - percentile])
+            min_lat, max_lat = np.percentile(lats, [percentile, 100 - percentile])
+        grid = cls(float(min_lng), float(min_lat), float(max_lng), float(max_lat), cell_size_m)
+        pad_lng = padding_cells * grid.cell_lng
+        pad_lat = padding_cells * grid.cell_lat
+        grid = cls(grid.min_lng - pad_lng, grid.min_lat - pad_lat,
+                   grid.max_lng + pad_lng, grid.max_lat + pad_lat, cell_size_m)
+        if max_cells is not None and grid.width * grid.height > max_cells:
+            raise ValueError(f"Hotspot grid of {grid.width}x{grid.height} cells exceeds the limit of "
+                             f"{max_cells} cells; set explicit bounds or a larger cell size")
+        return grid
+
+    def contains(self, lngs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """Boolean mask of the points that fall inside the grid."""
+        return ((lngs >= self.min_lng) & (lngs < self.max_lng) &
+                (lats >= self.min_lat) & (lats < self.max_lat))
+
+    def bin(self, lngs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """Bin points into a (height, width) count array; points outside the grid are dropped."""
+        counts, _, _ = np.histogram2d(
+            lats, lngs,
+            bins=(self.height, self.width),
+            range=((self.min_lat, self.max_lat), (self.min_lng, self.max_lng))
+        )
+        return counts
+
+    def window(self, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> Tuple[slice, slice]:
+        """Row and column slices of the cells overlapping a bounding box."""
+        col0 = int(np.clip(math.floor((min_lng - self.min_lng) / self.cell_lng), 0, self.width))
+        col1 = int(np.clip(math.ceil((max_lng - self.min_lng) / self.cell_lng), 0, self.width))
+        row0 = int(np.clip(math.floor((min_lat - self.min_lat) / self.cell_lat), 0, self.height))
+        row1 = int(np.clip(math.ceil((max_lat - self.min_lat) / self.cell_lat), 0, self.height))
+        return slice(row0, row1), slice(col0, col1)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'min_lng': self.min_lng,
+            'min_lat': self.min_lat,
+            'max_lng': self.max_lng,
+            'max_lat': self.max_lat,
+            'cell_size_m': self.cell_size_m,
+            'width': self.width,
+            'height': self.height
+        }
+
+
+def gaussian_kernel(sigma_cells: float) -> np.ndarray:
+    """Normalised 2D Gaussian kernel truncated at 3 sigma."""
+    radius = max(1, int(math.ceil(3 * sigma_cells)))
+    axis = np.arange(-radius, radius + 1)
+    xx, yy = np.meshgrid(axis, axis)
+    kernel = np.exp(-(xx ** 2 + yy ** 2) / (2 * sigma_cells ** 2))
+    return kernel / kernel.sum()
+
+
+def disk_kernel(radius_cells: float) -> np.ndarray:
+    """Binary disk used to count neighbours within eps."""
+    radius = max(1, int(math.ceil(radius_cells)))
+    axis = np.arange(-radius, radius + 1)
+    xx, yy = np.meshgrid(axis, axis)
+    return (xx ** 2 + yy ** 2 <= radius_cells ** 2).astype(np.float64)
+
+
+class CategorySurface:
+    """Counts, KDE surface and hotspot polygons for one category."""
+
+    def __init__(self, counts: np.ndarray):
+        self.counts = counts
+        self.density = None
+        self.polygons: List[Dict[str, Any]] = []
+
+    def compute(self, grid: HotspotGrid, kde_kernel: np.ndarray, eps_kernel: np.ndarray, min_points: int) -> None:
+        # KDE: smoothed counts per cell via FFT convolution, expressed per km²
+        cell_area_km2 = (grid.cell_size_m / 1000.0) ** 2
+        smoothed = signal.fftconvolve(self.counts, kde_kernel, mode='same')
+        density = (np.clip(smoothed, 0, None) / cell_area_km2).astype(np.float32)
+
+        # Grid DBSCAN: a cell is a core cell when at least min_points incidents lie
+        # within eps of it; clusters are the connected components of core cells
+        neighbours = signal.fftconvolve(self.counts, eps_kernel, mode='same')
+        core = (neighbours >= min_points - 0.5) & (self.counts > 0)
+        labels, cluster_count = ndimage.label(core, structure=np.ones((3, 3)))
+        polygons = []
+        if cluster_count:
+            incident_counts = ndimage.sum(self.counts, labels, index=np.arange(1, cluster_count + 1))
+            peaks = ndimage.maximum(density, labels, index=np.arange(1, cluster_count + 1))
+        for label, (rows, cols) in enumerate(ndimage.find_objects(labels), start=1):
+            cell_rows, cell_cols = np.nonzero(labels[rows, cols] == label)
+            polygon = _cells_to_polygon(grid, cell_rows + rows.start, cell_cols + cols.start)
+            if polygon is None:
+                continue
+            polygon['properties'] = {
+                'incidents': int(incident_counts[label - 1]),
+                'peak_density': round(float(peaks[label - 1]), 3),
+                'cells': int(len(cell_rows))
+            }
+            polygons.append(polygon)
+        self.density = density
+        self.polygons = polygons
+
+
+def _cells_to_polygon(grid: HotspotGrid, rows: np.ndarray, cols: np.ndarray) -> Optional[Dict[str, Any]]:
+    """Convex hull of the corners of a set of grid cells as a GeoJSON Feature."""
+    corners = np.concatenate([
+        np.column_stack([cols + dc, rows + dr]) for dr in (0, 1) for dc in (0, 1)
+    ]).astype(np.float64)
+    lngs = grid.min_lng + corners[:, 0] * grid.cell_lng
+    lats = grid.min_lat + corners[:, 1] * grid.cell_lat
+    points = np.column_stack([lngs, lats])
+    try:
+        hull = points[ConvexHull(points).vertices]
+    except Exception:
+        # Degenerate hulls raise QhullError; skip them rather than fail the whole surface
+        return None
+    ring = [[round(float(lng), 6), round(float(lat), 6)] for lng, lat in hull]
+    ring.append(ring[0])
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+        'bbox': [float(lngs.min()), float(lats.min()), float(lngs.max()), float(lats.max())]
+    }
+
+
+class HotspotEngine:
+    """
+    Precomputed per-category KDE surfaces and hotspot polygons.
+
+    A full build bins every incident once; afterwards only rows with an id above
+    the last one seen are binned and only the categories they touch are
+    recomputed. Any other change (updates, deletes) falls back to a full build;
+    see HotspotWorker.
+    """
+
+    def __init__(self, cell_size_m: float = 100.0, bandwidth_m: float = 250.0,
+                 eps_m: float = 150.0, min_points: int = 25,
+                 bounds: Optional[Tuple[float, float, float, float]] = None,
+                 bounds_percentile: float = 0.1, max_grid_cells: int = 4_000_000):
+        self.cell_size_m = cell_size_m
+        self.bandwidth_m = bandwidth_m
+        self.eps_m = eps_m
+        self.min_points = min_points
+        self.bounds = bounds
+        self.bounds_percentile = bounds_percentile
+        self.max_grid_cells = max_grid_cells
+        self.kde_kernel = gaussian_kernel(bandwidth_m / cell_size_m)
+        self.eps_kernel = disk_kernel(eps_m / cell_size_m)
+        self.grid: Optional[HotspotGrid] = None
+        self.surfaces: Dict[str, CategorySurface] = {}
+        self.max_id = 0
+        self.data_version = None
+        self.updated_at = None
+
+    def full_build(self, rows: Iterable[Tuple[int, str, float, float]], data_version: Optional[str]) -> None:
+        """Rebuild everything from (id, category, lng, lat) rows."""
+        started = time.perf_counter()
+        rows = list(rows)
+        data = [row for row in rows if row[1] and row[2] is not None and row[3] is not None]
+        if not data:
+            logger.warning("No incidents available for hotspot computation")
+            self.data_version = data_version
+            return
+        categories = np.array([row[1] for row in data], dtype=object)
+        lngs = np.fromiter((row[2] for row in data), dtype=np.float64, count=len(data))
+        lats = np.fromiter((row[3] for row in data), dtype=np.float64, count=len(data))
+
+        padding = self.kde_kernel.shape[0] // 2
+        grid = HotspotGrid.from_points(lngs, lats, self.cell_size_m, padding, bounds=self.bounds,
+                                       percentile=self.bounds_percentile, max_cells=self.max_grid_cells)
+        inside = grid.contains(lngs, lats)
+        if not inside.all():
+            logger.warning("%d incidents fall outside the hotspot grid and were skipped", int((~inside).sum()))
+            categories, lngs, lats = categories[inside], lngs[inside], lats[inside]
+        surfaces = {ALL_CATEGORIES: CategorySurface(grid.bin(lngs, lats))}
+        for category in np.unique(categories):
+            mask = categories == category
+            surfaces[str(category)] = CategorySurface(grid.bin(lngs[mask], lats[mask]))
+        for surface in surfaces.values():
+            surface.compute(grid, self.kde_kernel, self.eps_kernel, self.min_points)
+
+        # Swap in the finished state so readers never see a half-built surface
+        self.surfaces = surfaces
+        self.grid = grid
+        # Rows without a category or location still count towards the id watermark
+        self.max_id = max(row[0] for row in rows)
+        self.data_version = data_version
+        self.updated_at = time.time()
+        logger.info("Built hotspot surfaces for %d categories on a %dx%d grid in %.2fs",
+                    len(surfaces) - 1, grid.width, grid.height, time.perf_counter() - started)
+
+    def incremental_update(self, rows: Iterable[Tuple[int, str, float, float]], data_version: Optional[str]) -> int:
+        """Bin newly ingested (id, category, lng, lat) rows and recompute only the affected categories."""
+        by_category: Dict[str, Tuple[List[float], List[float]]] = {}
+        max_id = self.max_id
+        for crime_id, category, lng, lat in rows:
+            max_id = max(max_id, crime_id)
+            if not category or lng is None or lat is None:
+                continue
+            lngs, lats = by_category.setdefault(category, ([], []))
+            lngs.append(lng)
+            lats.append(lat)
+
+        # Readers keep using the current surfaces while the touched ones are recomputed
+        # in fresh objects; the new mapping is swapped in once they are all complete
+        new_counts: Dict[str, np.ndarray] = {}
+        dropped = 0
+        for category, (lngs, lats) in by_category.items():
+            counts = self.grid.bin(np.asarray(lngs), np.asarray(lats))
+            dropped += len(lngs) - int(counts.sum())
+            for key in (category, ALL_CATEGORIES):
+                if key not in new_counts:
+                    surface = self.surfaces.get(key)
+                    new_counts[key] = (surface.counts if surface is not None
+                                       else np.zeros((self.grid.height, self.grid.width)))
+                new_counts[key] = new_counts[key] + counts
+
+        surfaces = dict(self.surfaces)
+        for key, counts in new_counts.items():
+            surface = CategorySurface(counts)
+            surface.compute(self.grid, self.kde_kernel, self.eps_kernel, self.min_points)
+            surfaces[key] = surface
+        touched = set(new_counts)
+
+        self.surfaces = surfaces
+        self.max_id = max_id
+        self.data_version = data_version
+        self.updated_at = time.time()
+        added = sum(len(lngs) for lngs, _ in by_category.values())
+        if added:
+            logger.info("Incrementally added %d incidents to hotspot surfaces (%d categories)", added, len(touched) - 1)
+        if dropped:
+            logger.warning("%d new incidents fall outside the hotspot grid and were skipped", dropped)
+        return added
+
+    def query(self, category: Optional[str], bbox: Optional[Tuple[float, float, float, float]],
+              kind: str = 'raster', max_cells: int = 256) -> Optional[Dict[str, Any]]:
+        """
+        Return the density raster or hotspot polygons of a category within a viewport.
+
+        Rasters larger than max_cells on a side are downsampled by block maximum so
+        peaks survive at low zoom.
+        """
+        surface = self.surfaces.get(category or ALL_CATEGORIES)
+        if surface is None or self.grid is None:
+            return None
+        grid = self.grid
+        if bbox is None:
+            bbox = (grid.min_lng, grid.min_lat, grid.max_lng, grid.max_lat)
+
+        if kind == 'polygons':
+            min_lng, min_lat, max_lng, max_lat = bbox
+            features = [
+                polygon for polygon in surface.polygons
+                if polygon['bbox'][0] <= max_lng and polygon['bbox'][2] >= min_lng
+                and polygon['bbox'][1] <= max_lat and polygon['bbox'][3] >= min_lat
+            ]
+            return {'type': 'FeatureCollection', 'features': features}
+
+        rows, cols = grid.window(*bbox)
+        values = surface.density[rows, cols]
+        step = max(1, int(math.ceil(max(values.shape + (1,)) / max_cells)))
+        if step > 1 and values.size:
+            height = int(math.ceil(values.shape[0] / step)) * step
+            width = int(math.ceil(values.shape[1] / step)) * step
+            padded = np.zeros((height, width), dtype=values.dtype)
+            padded[:values.shape[0], :values.shape[1]] = values
+            values = padded.reshape(height // step, step, width // step, step).max(axis=(1, 3))
+        return {
+            'bounds': [
+                grid.min_lng + cols.start * grid.cell_lng,
+                grid.min_lat + rows.start * grid.cell_lat,
+                grid.min_lng + cols.stop * grid.cell_lng,
+                grid.min_lat + rows.stop * grid.cell_lat
+            ],
+            'cell_size_m': grid.cell_size_m * step,
+            'width': int(values.shape[1]),
+            'height': int(values.shape[0]),
+            'max_density': round(float(values.max()), 3) if values.size else 0.0,
+            'units': 'incidents/km2',
+            # Rows run south to north, matching increasing latitude
+            'values': np.round(values, 3).tolist()
+        }
+
+
+class HotspotWorker:
+    """
+    Background thread keeping a HotspotEngine in sync with crimes_data.
+
+    Pure appends are applied incrementally. Whether anything else happened is
+    read from the mutation counter that the crimes_data trigger bumps on every
+    UPDATE, DELETE or TRUNCATE; when it moved, or cannot be read, the surfaces
+    are rebuilt from scratch.
+    """
+
+    def __init__(self, engine: HotspotEngine,
+                 get_version: Callable[[], str],
+                 load_all: Callable[[], Iterable[Tuple[int, str, float, float]]],
+                 load_since: Callable[[int], Iterable[Tuple[int, str, float, float]]],
+                 count_rows: Callable[[], int],
+                 get_mutation_count: Callable[[], Optional[int]],
+                 interval: float = 30.0, retry_after: float = 600.0):
+        self.engine = engine
+        self.get_version = get_version
+        self.load_all = load_all
+        self.load_since = load_since
+        self.count_rows = count_rows
+        self.get_mutation_count = get_mutation_count
+        self.interval = interval
+        self.retry_after = retry_after
+        self.indexed_rows = 0
+        self.indexed_mutations: Optional[int] = None
+        # Why the last refresh did not produce surfaces, and for which data version
+        self.last_error: Optional[str] = None
+        self._failed_version = None
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.engine.grid is not None
+
+    def refresh(self) -> None:
+        """Bring the engine up to the current data version."""
+        version = self.get_version()
+        if self.ready and version == self.engine.data_version:
+            return
+        # A failed build is not retried every interval for the same data
+        if (self.last_error is not None and version == self._failed_version
+                and time.monotonic() - self._failed_at < self.retry_after):
+            return
+        with self._lock:
+            try:
+                self._refresh(version)
+            except Exception as e:
+                self._fail(version, str(e))
+                raise
+            if not self.ready:
+                self._fail(version, "No incidents available for hotspot computation")
+            else:
+                self.last_error = None
+
+    def _fail(self, version, error: str) -> None:
+        self.last_error = error
+        self._failed_version = version
+        self._failed_at = time.monotonic()
+
+    def _refresh(self, version) -> None:
+        # Read before the rows, so a change made while loading shows up next time
+        mutations = self.get_mutation_count()
+        if not self.ready:
+            self.engine.full_build(self.load_all(), version)
+            self.indexed_rows = self.count_rows()
+            self.indexed_mutations = mutations
+            return
+        # Appends only: no UPDATE / DELETE since the last refresh, and a row
+        # count that grew by exactly the rows found above the id watermark
+        added_rows = list(self.load_since(self.engine.max_id))
+        row_count = self.count_rows()
+        appended = (
+            mutations is not None
+            and mutations == self.indexed_mutations
+            and row_count == self.indexed_rows + len(added_rows)
+        )
+        if appended:
+            self.engine.incremental_update(added_rows, version)
+        else:
+            logger.info("crimes_data changed beyond appends, rebuilding hotspot surfaces")
+            engine = HotspotEngine(self.engine.cell_size_m, self.engine.bandwidth_m,
+                                   self.engine.eps_m, self.engine.min_points, self.engine.bounds,
+                                   self.engine.bounds_percentile, self.engine.max_grid_cells)
+            engine.full_build(self.load_all(), version)
+            self.engine = engine
+        self.indexed_rows = row_count
+        self.indexed_mutations = mutations
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Hotspot refresh failed: %s", e)
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """Start the refresh loop if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='hotspot-worker', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
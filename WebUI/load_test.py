@@ -0,0 +1,179 @@
+"""
+Logging-overhead load test for the backend.
+
+Starts backend.py once per log level, drives the same request mix against it
+from a pool of client threads, and prints the throughput and latency of each
+run so the cost of DEBUG logging can be compared with INFO.
+
+Examples:
+    python load_test.py
+    python load_test.py --levels DEBUG INFO --duration 30 --concurrency 16 --log-format text
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_DESCRIPTIONS = [
+    "Petty theft from locked auto, window smashed and laptop taken",
+    "Suspect evading a police officer recklessly at high speed",
+    "Battery on the street, victim treated at the scene",
+    "Vandalism to a parked vehicle, tires slashed overnight",
+    "Possession of narcotics for sale near the station"
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _request(base_url: str, rng: random.Random, predict_share: float = 0.5) -> urllib.request.Request:
+    """One request of the mix: a prediction or an uncached map viewport."""
+    if rng.random() < predict_share:
+        body = json.dumps({'description': rng.choice(SAMPLE_DESCRIPTIONS)}).encode('utf-8')
+        return urllib.request.Request(f"{base_url}/predict-category", data=body,
+                                      headers={'Content-Type': 'application/json'})
+    # Jitter the viewport so responses are not served from the version-keyed cache
+    lng = -122.45 + rng.random() * 0.05
+    lat = 37.75 + rng.random() * 0.05
+    return urllib.request.Request(
+        f"{base_url}/crimes?min_lng={lng:.5f}&min_lat={lat:.5f}&max_lng={lng + 0.01:.5f}"
+        f"&max_lat={lat + 0.01:.5f}&zoom={rng.choice([12, 16])}"
+    )
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and process.poll() is None:
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.1)
+    return False
+
+
+def run_level(level: str, args) -> Dict[str, Any]:
+    """Start the backend at one log level and measure the request mix against it."""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}{os.getenv('API_PREFIX', '/api')}"
+    env = dict(os.environ, PORT=str(port), DEBUG='false', LOG_LEVEL=level,
+               LOG_FORMAT=args.log_format, WARMUP_MODE='off')
+
+    # Logs go to a real file so the cost of writing them is part of the measurement
+    with tempfile.NamedTemporaryFile(prefix=f"backend-{level.lower()}-", suffix='.log', delete=False) as log_file:
+        log_path = log_file.name
+        process = subprocess.Popen([sys.executable, 'backend.py'], cwd=HERE, env=env,
+                                   stdout=log_file, stderr=log_file)
+    try:
+        if not _wait_until_up(f"{base_url}/health", process, args.startup_timeout):
+            return {'level': level, 'error': f"backend did not start, see {log_path}"}
+        # Load the model before measuring; full warm-up would also start background workers
+        try:
+            urllib.request.urlopen(_request(base_url, random.Random(0), 1.0), timeout=60).read()
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+
+        latencies: List[float] = []
+        errors = [0]
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + args.duration
+
+        def client(seed: int) -> None:
+            rng = random.Random(seed)
+            local_latencies = []
+            local_errors = 0
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    urllib.request.urlopen(_request(base_url, rng, args.predict_share), timeout=30).read()
+                except urllib.error.HTTPError as e:
+                    e.read()
+                    local_errors += 1
+                except (urllib.error.URLError, ConnectionError, socket.timeout):
+                    local_errors += 1
+                local_latencies.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local_latencies)
+                errors[0] += local_errors
+
+        threads = [threading.Thread(target=client, args=(args.seed + i,)) for i in range(args.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    latencies.sort()
+
+    def percentile(p: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+    return {
+        'level': level,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'log_bytes': os.path.getsize(log_path),
+        'log_file': log_path
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description="Compare backend throughput across log levels.")
+    parser.add_argument('--levels', nargs='+', default=['DEBUG', 'INFO'], help="Log levels to compare")
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds of load per level")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads")
+    parser.add_argument('--log-format', choices=['json', 'text'], default='json', help="LOG_FORMAT for the backend")
+    parser.add_argument('--startup-timeout', type=float, default=120.0, help="Seconds to wait for the backend")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the request mix")
+    parser.add_argument('--predict-share', type=float, default=0.5,
+                        help="Fraction of requests that are predictions; the rest are /crimes viewports")
+    args = parser.parse_args(argv)
+
+    load_dotenv(os.path.join(HERE, '.env'))
+    results = [run_level(level, args) for level in args.levels]
+
+    print(f"{'level':<8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'log bytes':>11}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['level']:<8} {result['error']}")
+            continue
+        print(f"{result['level']:<8} {result['requests']:>9} {result['errors']:>7} "
+              f"{result['requests_per_second']:>8} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['log_bytes']:>11}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional, Tuple
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra` fields included as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Hands records to a background listener without formatting or blocking.
+
+    The stock QueueHandler formats the message on the calling thread and raises
+    when a bounded queue is full; here records are queued as-is, so formatting
+    happens on the listener thread, and records are dropped (and counted) when
+    the queue is full rather than stalling a request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._reported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Shallow copy so filters further down cannot mutate the caller's record
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def report_dropped(self) -> int:
+        """
+        Log how many records were dropped since the last report.
+
+        Returns:
+            The number of newly dropped records
+        """
+        count = self.dropped - self._reported
+        if count:
+            self._reported += count
+            # If this record is dropped as well, it is counted and reported next time
+            logging.getLogger(__name__).warning(
+                "Dropped %d log records because the log queue was full", count,
+                extra={'dropped': count, 'dropped_total': self.dropped}
+            )
+        return count
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `burst` records per message template and logger every `interval` seconds.
+
+    Keys on the unformatted message, so per-row errors logged with the same
+    template share a budget. Records logged with a `_rate_key` extra are keyed on
+    that instead, for callers that share a template across unrelated messages.
+    Suppressed counts are reported in a summary record once the window ends
+    (see start()), or on the first record after it when no sweeper is running.
+    """
+
+    def __init__(self, burst: int = 10, interval: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        # key -> [window start, records passed, records suppressed]
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._on_sweep: Optional[Callable[[], object]] = None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, str(getattr(record, '_rate_key', None) or record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+    def flush_expired(self) -> int:
+        """
+        Close windows that have ended and log one summary per window that suppressed records.
+
+        Returns:
+            The number of summary records logged
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, window in list(self._windows.items()):
+                if now - window[0] >= self.interval:
+                    del self._windows[key]
+                    if window[2]:
+                        expired.append((key, window[2]))
+        # Logged outside the lock: the summaries pass through this filter too
+        for (name, rate_key), suppressed in expired:
+            logging.getLogger(name).warning(
+                "Suppressed %d log records like: %s", suppressed, rate_key,
+                extra={'suppressed': suppressed, '_rate_key': f"suppressed:{rate_key}"}
+            )
+        return len(expired)
+
+    def _run(self) -> None:
+        while not self._stop.wait(min(self.interval, 5.0)):
+            self.flush_expired()
+            if self._on_sweep is not None:
+                self._on_sweep()
+
+    def start(self, on_sweep: Optional[Callable[[], object]] = None) -> None:
+        """
+        Start a daemon thread that reports suppressed counts shortly after each window ends.
+
+        Args:
+            on_sweep: Optional callable run on the same thread after every sweep
+        """
+        self._on_sweep = on_sweep
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='log-rate-limit', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class RowErrorAggregator:
+    """
+    Collect errors raised while processing rows and log them as a single record.
+
+    Usage:
+        errors = RowErrorAggregator(logger, "Error processing crime")
+        for row in rows:
+            try:
+                ...
+            except Exception as e:
+                errors.add(e, row_id=row.id)
+        errors.flush()
+    """
+
+    def __init__(self, logger: logging.Logger, message: str, level: int = logging.ERROR):
+        self.logger = logger
+        self.message = message
+        self.level = level
+        self.count = 0
+        self.first_error: Optional[str] = None
+        self.first_row_id = None
+
+    def add(self, error: Exception, row_id=None) -> None:
+        if self.count == 0:
+            self.first_error = str(error)
+            self.first_row_id = row_id
+        self.count += 1
+
+    def flush(self) -> None:
+        if self.count:
+            self.logger.log(self.level, "%s: %d rows failed (first row %s: %s)",
+                            self.message, self.count, self.first_row_id, self.first_error,
+                            extra={'failed_rows': self.count, '_rate_key': self.message})
+            self.count = 0
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[AsyncQueueHandler] = None
+
+
+def dropped_records() -> int:
+    """Total log records dropped because the queue was full since logging was configured."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def configure_logging(level: str = 'INFO', fmt: str = 'json', queue_size: int = 10000,
+                      rate_limit_burst: int = 10, rate_limit_interval: float = 60.0) -> QueueListener:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Args:
+        level: Root log level name
+        fmt: 'json' for structured records, 'text' for the classic line format
+        queue_size: Records buffered before new ones are dropped
+        rate_limit_burst: Warnings/errors allowed per message template per interval
+        rate_limit_interval: Rate limit window in seconds
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if fmt == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = AsyncQueueHandler(log_queue)
+    rate_limit = RateLimitFilter(rate_limit_burst, rate_limit_interval)
+    queue_handler.addFilter(rate_limit)
+    # The sweeper thread also reports records lost to a full queue
+    rate_limit.start(on_sweep=queue_handler.report_dropped)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    _queue_handler = queue_handler
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Drain whatever is still queued on interpreter exit
+    atexit.register(_listener.stop)
+    return _listener
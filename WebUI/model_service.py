@@ -1,9 +1,8 @@
 import pickle
 import os
 import logging
+import threading
 from typing import Dict, Any, Optional
-import joblib
-import traceback
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,10 +24,11 @@ class CrimeCategoryPredictor:
         
         logger.info(f"Attempting to load model from {self.model_path}")
         
-        # Try different loading methods
+        # Try different loading methods; joblib first, since the shipped model and
+        # everything train_model.py writes are joblib dumps that plain pickle rejects
         loading_methods = [
-            ('pickle', self._load_with_pickle),
             ('joblib', self._load_with_joblib),
+            ('pickle', self._load_with_pickle),
             # Add more loading methods if needed
         ]
         
@@ -65,6 +65,8 @@ class CrimeCategoryPredictor:
     
     def _load_with_joblib(self):
         """Load model using joblib."""
+        # Imported here rather than at module level so importing the service stays cheap
+        import joblib
         return joblib.load(self.model_path)
     
     def predict_category(self, description: str) -> Dict[str, Any]:
@@ -86,7 +88,7 @@ class CrimeCategoryPredictor:
             return {"error": "Invalid description", "category": None, "confidence": 0}
         
         try:
-            logger.info(f"Making prediction for text: '{description[:100]}...' (truncated)")
+            logger.debug("Making prediction for text of length %d", len(description))
             
             # Different models might have different prediction interfaces
             # Try various common prediction methods
@@ -96,19 +98,19 @@ class CrimeCategoryPredictor:
             # Method 1: Standard scikit-learn style prediction
             try:
                 prediction = self.model.predict([description])[0]
-                logger.info(f"Prediction successful: {prediction}")
+                logger.debug("Prediction successful: %s", prediction)
                 
                 # Try to get prediction probability if available
                 try:
                     proba = self.model.predict_proba([description])
                     confidence = float(proba.max())
-                    logger.info(f"Got confidence score: {confidence}")
+                    logger.debug("Got confidence score: %s", confidence)
                 except (AttributeError, ValueError) as prob_err:
-                    logger.warning(f"Could not get probability: {str(prob_err)}")
+                    logger.warning("Could not get probability: %s", prob_err)
                     confidence = 1.0  # Default confidence
             
             except Exception as predict_err:
-                logger.warning(f"Standard prediction failed: {str(predict_err)}")
+                logger.warning("Standard prediction failed: %s", predict_err)
                 
                 # Method 2: Try direct callable model (like some TensorFlow/PyTorch models)
                 try:
@@ -120,9 +122,9 @@ class CrimeCategoryPredictor:
                     else:
                         prediction = str(result)
                     confidence = 0.9  # Default confidence for this method
-                    logger.info(f"Direct prediction successful: {prediction}")
+                    logger.debug("Direct prediction successful: %s", prediction)
                 except Exception as direct_err:
-                    logger.warning(f"Direct prediction failed: {str(direct_err)}")
+                    logger.warning("Direct prediction failed: %s", direct_err)
             
             if prediction is None:
                 raise ValueError("All prediction methods failed")
@@ -133,31 +135,35 @@ class CrimeCategoryPredictor:
             }
             
         except Exception as e:
-            logger.error(f"Error during prediction: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Error during prediction: %s", e)
             return {"error": str(e), "category": None, "confidence": 0}
 
 # Singleton instance for reuse
 _predictor_instance = None
+_predictor_lock = threading.Lock()
 
 def get_predictor(model_path: str = "crime_category_prediction_model.pkl") -> CrimeCategoryPredictor:
     """Get or create the predictor singleton."""
     global _predictor_instance
     if _predictor_instance is None:
-        try:
-            _predictor_instance = CrimeCategoryPredictor(model_path)
-        except Exception as init_error:
-            logger.error(f"Failed to initialize predictor: {init_error}")
-            # We'll create a dummy predictor that always returns an error
-            # Store the error message to avoid scoping issues
-            error_message = str(init_error)
-            
-            class DummyPredictor:
-                def __init__(self, error_msg):
-                    self.error_msg = error_msg
+        # The background warm-up and request threads can get here at the same
+        # time; the lock makes sure the model is only loaded once
+        with _predictor_lock:
+            if _predictor_instance is None:
+                try:
+                    _predictor_instance = CrimeCategoryPredictor(model_path)
+                except Exception as init_error:
+                    logger.error(f"Failed to initialize predictor: {init_error}")
+                    # We'll create a dummy predictor that always returns an error
+                    # Store the error message to avoid scoping issues
+                    error_message = str(init_error)
                     
-                def predict_category(self, description: str) -> Dict[str, Any]:
-                    return {"error": f"Model could not be loaded: {self.error_msg}", "category": None, "confidence": 0}
-            
-            _predictor_instance = DummyPredictor(error_message)
+                    class DummyPredictor:
+                        def __init__(self, error_msg):
+                            self.error_msg = error_msg
+                            
+                        def predict_category(self, description: str) -> Dict[str, Any]:
+                            return {"error": f"Model could not be loaded: {self.error_msg}", "category": None, "confidence": 0}
+                    
+                    _predictor_instance = DummyPredictor(error_message)
     return _predictor_instance
\ No newline at end of file
@@ -0,0 +1,288 @@
+import hmac
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = '.speedscope.json'
+META_SUFFIX = '.meta.json'
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+# Per-thread state of the request being profiled, if any
+_active = threading.local()
+
+# Sequence number appended to profile ids so ids created in the same millisecond
+# still sort in creation order
+_id_sequence = itertools.count()
+_id_lock = threading.Lock()
+
+
+def _new_profile_id() -> str:
+    """Profile id that sorts by creation time: local time to the millisecond plus a sequence number."""
+    with _id_lock:
+        now = time.time()
+        sequence = next(_id_sequence) % 1000000
+    millis = int(now * 1000) % 1000
+    return f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{millis:03d}-{sequence:06d}-{uuid.uuid4().hex[:4]}"
+
+
+class StackSampler:
+    """
+    Sampling profiler for a single thread.
+
+    A daemon thread reads the target thread's current frame every `interval`
+    seconds and records the call stack; the profiled code is never instrumented.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: List[Tuple[Tuple[Tuple[str, str, int], ...], float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self.started_at = None
+        self.stopped_at = None
+
+    def _run(self) -> None:
+        previous = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                previous = now
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append((tuple(stack), now - previous))
+            previous = now
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """Render the samples in speedscope's sampled-profile file format."""
+        frame_index: Dict[Tuple[str, str, int], int] = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, weight in self.samples:
+            indices = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+                indices.append(frame_index[key])
+            samples.append(indices)
+            weights.append(weight)
+        duration = (self.stopped_at or time.perf_counter()) - (self.started_at or 0)
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'crime-app request_profiler',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': duration,
+                'samples': samples,
+                'weights': weights
+            }]
+        }
+
+
+class RequestProfile:
+    """Sampler plus SQL statements captured for one request."""
+
+    def __init__(self, interval: float, trigger: str):
+        self.id = _new_profile_id()
+        self.trigger = trigger
+        self.started = time.perf_counter()
+        self.sampler = StackSampler(threading.get_ident(), interval)
+        self.statements: List[Dict[str, Any]] = []
+        self._statement_started: Optional[float] = None
+
+    def before_statement(self) -> None:
+        self._statement_started = time.perf_counter()
+
+    def after_statement(self, statement: str) -> None:
+        if self._statement_started is None:
+            return
+        finished = time.perf_counter()
+        self.statements.append({
+            'statement': statement if len(statement) <= 2000 else statement[:2000] + '...',
+            'start_ms': round((self._statement_started - self.started) * 1000, 3),
+            'duration_ms': round((finished - self._statement_started) * 1000, 3)
+        })
+        self._statement_started = None
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request profiling for a Flask app.
+
+    A request is profiled when it carries the admin header pair
+    (X-Profile: 1 and a matching X-Admin-Token) or is picked by random
+    sampling at `sample_rate`. Nothing is registered on the app unless
+    profiling is enabled, so the disabled path costs nothing.
+    """
+
+    def __init__(self, profile_dir: str, admin_token: Optional[str], sample_rate: float = 0.0,
+                 interval_ms: float = 5.0, max_files: int = 100, excluded_prefix: Optional[str] = None):
+        self.profile_dir = profile_dir
+        self.admin_token = admin_token or None
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000.0
+        self.max_files = max_files
+        self.excluded_prefix = excluded_prefix
+        # Profiles are written from one thread per request; pruning runs under a lock
+        self._prune_lock = threading.Lock()
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def is_admin_request(self) -> bool:
+        """Whether the current request carries the admin token."""
+        token = request.headers.get('X-Admin-Token', '')
+        return bool(self.admin_token) and hmac.compare_digest(token, self.admin_token)
+
+    def init_app(self, app) -> None:
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        logger.info("Request profiling enabled (sample rate %s, %.0f ms interval, writing to %s)",
+                    self.sample_rate, self.interval * 1000, self.profile_dir)
+
+    def _trigger(self) -> Optional[str]:
+        if self.excluded_prefix and request.path.startswith(self.excluded_prefix):
+            return None
+        if request.headers.get('X-Profile', '').lower() in ('1', 'true', 'yes') and self.is_admin_request():
+            return 'header'
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def _before_request(self) -> None:
+        trigger = self._trigger()
+        if trigger is None:
+            return
+        profile = RequestProfile(self.interval, trigger)
+        _active.profile = profile
+        profile.sampler.start()
+
+    def _after_request(self, response):
+        profile = getattr(_active, 'profile', None)
+        if profile is None:
+            return response
+        _active.profile = None
+        profile.sampler.stop()
+
+        duration_ms = round((time.perf_counter() - profile.started) * 1000, 3)
+        meta = {
+            'id': profile.id,
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('utf-8', 'replace'),
+            'status': response.status_code,
+            'trigger': profile.trigger,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'duration_ms': duration_ms,
+            'samples': len(profile.sampler.samples),
+            'sql_count': len(profile.statements),
+            'sql_total_ms': round(sum(s['duration_ms'] for s in profile.statements), 3),
+            'sql': profile.statements
+        }
+        speedscope = profile.sampler.to_speedscope(f"{request.method} {request.path} ({duration_ms} ms)")
+        response.headers['X-Profile-Id'] = profile.id
+        # Serialise and write off the request thread
+        threading.Thread(target=self._write, args=(profile.id, speedscope, meta), daemon=True).start()
+        return response
+
+    def _teardown_request(self, exc=None) -> None:
+        # after_request does not run when a view raises; make sure the sampler stops
+        profile = getattr(_active, 'profile', None)
+        if profile is not None:
+            _active.profile = None
+            profile.sampler.stop()
+
+    def _write(self, profile_id: str, speedscope: Dict[str, Any], meta: Dict[str, Any]) -> None:
+        try:
+            with open(os.path.join(self.profile_dir, profile_id + PROFILE_SUFFIX), 'w') as f:
+                json.dump(speedscope, f)
+            with open(os.path.join(self.profile_dir, profile_id + META_SUFFIX), 'w') as f:
+                json.dump(meta, f)
+            self._prune()
+        except Exception as e:
+            logger.error("Could not write profile %s: %s", profile_id, e)
+
+    def _prune(self) -> None:
+        # Profile ids sort by creation time, so the oldest profiles come first
+        with self._prune_lock:
+            metas = sorted(name for name in os.listdir(self.profile_dir) if name.endswith(META_SUFFIX))
+            for name in metas[:max(0, len(metas) - self.max_files)]:
+                profile_id = name[:-len(META_SUFFIX)]
+                for suffix in (META_SUFFIX, PROFILE_SUFFIX):
+                    try:
+                        os.remove(os.path.join(self.profile_dir, profile_id + suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def list_profiles(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Metadata of the most recent profiles, newest first, without the SQL statements."""
+        metas = sorted((name for name in os.listdir(self.profile_dir) if name.endswith(META_SUFFIX)), reverse=True)
+        profiles = []
+        for name in metas[:limit]:
+            try:
+                with open(os.path.join(self.profile_dir, name)) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta.pop('sql', None)
+            profiles.append(meta)
+        return profiles
+
+    def profile_path(self, profile_id: str, meta: bool = False) -> Optional[str]:
+        """Path of a stored profile (or its metadata), or None if it does not exist."""
+        if not re.fullmatch(r'[0-9A-Za-z\-]+', profile_id):
+            return None
+        path = os.path.join(self.profile_dir, profile_id + (META_SUFFIX if meta else PROFILE_SUFFIX))
+        return path if os.path.exists(path) else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_active, 'profile', None)
+    if profile is not None:
+        profile.before_statement()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_active, 'profile', None)
+    if profile is not None:
+        profile.after_statement(statement)
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def get_text_vectorizer(model):
+    """Return the text-to-features part of the category model, or None if it has none."""
+    # GridSearchCV wrappers expose the fitted pipeline as best_estimator_
+    model = getattr(model, 'best_estimator_', model)
+    named_steps = getattr(model, 'named_steps', None)
+    if named_steps and len(named_steps) > 2:
+        # Preprocessing + vectorizer + classifier: everything but the classifier
+        return model[:-1]
+    if named_steps:
+        for name in ('tfidf', 'hashing'):
+            if name in named_steps:
+                return named_steps[name]
+        for step in named_steps.values():
+            if hasattr(step, 'vocabulary_') and hasattr(step, 'transform'):
+                return step
+    if hasattr(model, 'vocabulary_') and hasattr(model, 'transform'):
+        return model
+    return None
+
+
+class SimilarIncidentIndex:
+    """
+    Sparse inverted index over crime descriptions in the model's TF-IDF (or hashed) space.
+
+    Rows are grouped per category and stored column-major (CSC), so scoring a
+    query only touches the postings of the terms it actually contains instead
+    of the whole category.
+    """
+
+    def __init__(self, vectorizer, data_version: Optional[str] = None):
+        self.vectorizer = vectorizer
+        self.data_version = data_version
+        self.partitions: Dict[str, Tuple[sparse.csc_matrix, np.ndarray]] = {}
+        self.row_count = 0
+        self.build_seconds = None
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[str]]], batch_size: int = 50000) -> None:
+        """
+        Build the index from (id, category, description) rows.
+
+        Args:
+            rows: Iterable of rows, typically a streaming database query
+            batch_size: Number of descriptions transformed per vectorizer call
+        """
+        started = time.perf_counter()
+        chunks: Dict[str, List[Tuple[np.ndarray, sparse.csr_matrix]]] = {}
+
+        def flush(batch):
+            by_category: Dict[str, Tuple[List[int], List[str]]] = {}
+            for crime_id, category, description in batch:
+                ids, texts = by_category.setdefault(category, ([], []))
+                ids.append(crime_id)
+                texts.append(description or "")
+            for category, (ids, texts) in by_category.items():
+                matrix = self.vectorizer.transform(texts).tocsr()
+                chunks.setdefault(category, []).append((np.asarray(ids, dtype=np.int64), matrix))
+
+        batch = []
+        for row in rows:
+            if not row[1]:
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        partitions = {}
+        row_count = 0
+        for category, parts in chunks.items():
+            ids = np.concatenate([part[0] for part in parts])
+            matrix = sparse.vstack([part[1] for part in parts], format='csr')
+            # Sort rows by id so positions can be recovered with searchsorted
+            order = np.argsort(ids, kind='stable')
+            partitions[category] = (matrix[order].tocsc(), ids[order])
+            row_count += len(ids)
+
+        self.partitions = partitions
+        self.row_count = row_count
+        self.build_seconds = time.perf_counter() - started
+        logger.info("Built similarity index over %d descriptions in %d categories (%.2fs)",
+                    row_count, len(partitions), self.build_seconds)
+
+    def score(self, description: str, category: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Compute cosine similarity between a description and every indexed row of a category.
+
+        Returns:
+            A tuple of (ids, similarities) sorted by id, or None if the category is not indexed
+        """
+        partition = self.partitions.get(category)
+        if partition is None:
+            return None
+        matrix, ids = partition
+
+        query = self.vectorizer.transform([description or ""]).tocsr()
+        if query.nnz == 0:
+            return ids, np.zeros(len(ids), dtype=np.float64)
+
+        # TF-IDF rows are L2-normalised, so the dot product is the cosine similarity
+        similarities = matrix[:, query.indices] @ query.data
+        return ids, np.asarray(similarities, dtype=np.float64).ravel()
+
+    @staticmethod
+    def top_k(scored: Tuple[np.ndarray, np.ndarray], k: int) -> List[Tuple[int, float]]:
+        """Return the k most similar (id, similarity) pairs from a result returned by score()."""
+        ids, similarities = scored
+        if len(ids) == 0 or k <= 0:
+            return []
+
+        k = min(k, len(ids))
+        candidates = np.argpartition(-similarities, k - 1)[:k]
+        candidates = candidates[np.argsort(-similarities[candidates])]
+        return [(int(ids[i]), float(similarities[i])) for i in candidates if similarities[i] > 0]
+
+    @staticmethod
+    def lookup(scored: Tuple[np.ndarray, np.ndarray], crime_ids: Iterable[int]) -> Dict[int, float]:
+        """Look up the similarities of specific ids in a result returned by score()."""
+        ids, similarities = scored
+        crime_ids = np.asarray(list(crime_ids), dtype=np.int64)
+        if len(ids) == 0 or len(crime_ids) == 0:
+            return {}
+        positions = np.clip(np.searchsorted(ids, crime_ids), 0, len(ids) - 1)
+        found = ids[positions] == crime_ids
+        return {int(crime_id): float(similarities[pos])
+                for crime_id, pos, hit in zip(crime_ids, positions, found) if hit}
+
+
+def combine_scores(spatial: Dict[int, float], text: Dict[int, float],
+                   distance_scale_m: float, text_weight: float) -> Dict[int, float]:
+    """
+    Blend spatial distance (metres) and text similarity into a single score in [0, 1].
+
+    Distances are mapped through exp(-d / scale) so that an incident at the query
+    point scores 1 and one `distance_scale_m` away scores ~0.37.
+    """
+    scores = {}
+    for crime_id, distance in spatial.items():
+        proximity = float(np.exp(-max(distance, 0.0) / distance_scale_m))
+        scores[crime_id] = (1 - text_weight) * proximity + text_weight * text.get(crime_id, 0.0)
+    return scores
+
+
+# Singleton instance for reuse
+_index_instance = None
+_index_lock = threading.Lock()
+_index_building = False
+_last_build_started: Optional[float] = None
+
+
+def get_similarity_index() -> Optional[SimilarIncidentIndex]:
+    """Get the similarity index if it has finished building."""
+    return _index_instance
+
+
+def build_similarity_index_async(vectorizer, load_rows, data_version: Optional[str] = None,
+                                 min_interval: float = 0.0) -> bool:
+    """
+    Build the similarity index in a background thread.
+
+    Every write to crimes_data moves the data version, so under steady ingest a
+    rebuild per version would keep a worker permanently busy. Once an index
+    exists, rebuilds are therefore started at most once per `min_interval`
+    seconds and the previous index keeps serving in between.
+
+    Args:
+        vectorizer: The fitted TF-IDF vectorizer from the category model
+        load_rows: Callable returning an iterable of (id, category, description) rows.
+                   It runs on the worker thread, so it must set up its own app context.
+        data_version: The crimes_data version the rows are read at
+        min_interval: Minimum seconds between the starts of two builds once an index exists
+
+    Returns:
+        True if a build was started, False if one is already running or the last
+        build started less than `min_interval` seconds ago
+    """
+    global _index_building, _last_build_started
+    with _index_lock:
+        if _index_building:
+            return False
+        now = time.monotonic()
+        if (_index_instance is not None and _last_build_started is not None
+                and now - _last_build_started < min_interval):
+            return False
+        _index_building = True
+        _last_build_started = now
+
+    def worker():
+        global _index_instance, _index_building
+        try:
+            index = SimilarIncidentIndex(vectorizer, data_version)
+            index.build(load_rows())
+            _index_instance = index
+        except Exception as e:
+            logger.error("Failed to build similarity index: %s", e)
+        finally:
+            with _index_lock:
+                _index_building = False
+
+    threading.Thread(target=worker, name='similarity-index-builder', daemon=True).start()
+    return True
+
+
+def is_similarity_index_building() -> bool:
+    """Whether a background index build is currently running."""
+    return _index_building
@@ -0,0 +1,164 @@
+"""
+Startup-time report for the backend process.
+
+Measures two things and appends them as one JSON line to a report file so they
+can be tracked over time:
+
+- the `python -X importtime` breakdown of `import backend`
+- time from process start to the first response, and to the first healthy
+  (HTTP 200) response, of the health endpoint
+
+Examples:
+    python startup_report.py
+    python startup_report.py --top 20 --output startup_report.jsonl
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)')
+
+
+def import_breakdown(top: int) -> Dict[str, Any]:
+    """Run `import backend` under -X importtime and summarise the result."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import backend'],
+        cwd=HERE, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                'module': name,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2
+            })
+
+    backend = next((m for m in modules if m['module'] == 'backend' and m['depth'] == 0), None)
+    # Direct imports of backend are the ones a code change can actually move
+    direct = sorted((m for m in modules if m['depth'] == 1), key=lambda m: m['cumulative_ms'], reverse=True)
+    slowest = sorted(modules, key=lambda m: m['self_ms'], reverse=True)
+    return {
+        'ok': result.returncode == 0,
+        'backend_import_ms': backend['cumulative_ms'] if backend else None,
+        'modules_imported': len(modules),
+        'top_direct_imports': [
+            {'module': m['module'], 'cumulative_ms': m['cumulative_ms']} for m in direct[:top]
+        ],
+        'top_self_time': [
+            {'module': m['module'], 'self_ms': m['self_ms']} for m in slowest[:top]
+        ],
+        'error': result.stderr.strip().splitlines()[-1] if result.returncode != 0 and result.stderr else None
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_to_healthy(timeout: float, warmup_mode: str) -> Dict[str, Any]:
+    """Start backend.py and poll the health endpoint until it answers 200."""
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), DEBUG='false', WARMUP_MODE=warmup_mode)
+    url = f"http://127.0.0.1:{port}{os.getenv('API_PREFIX', '/api')}/health"
+
+    first_response: Optional[float] = None
+    first_healthy: Optional[float] = None
+    last_status: Optional[int] = None
+
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'backend.py'], cwd=HERE, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                break
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    last_status = response.status
+            except urllib.error.HTTPError as e:
+                last_status = e.code
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.02)
+                continue
+
+            elapsed = time.perf_counter() - started
+            if first_response is None:
+                first_response = elapsed
+            if last_status == 200:
+                first_healthy = elapsed
+                break
+            time.sleep(0.05)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return {
+        'warmup_mode': warmup_mode,
+        'first_response_ms': round(first_response * 1000, 1) if first_response is not None else None,
+        'first_healthy_ms': round(first_healthy * 1000, 1) if first_healthy is not None else None,
+        'last_status': last_status,
+        'exit_code': process.returncode if first_response is None else None
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Measure backend import time and time to first healthy response.")
+    parser.add_argument('--top', type=int, default=15, help="Number of modules listed in each breakdown")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds to wait for a healthy response")
+    parser.add_argument('--warmup-mode', default=os.getenv('WARMUP_MODE', 'background'),
+                        choices=['background', 'blocking', 'off'], help="WARMUP_MODE for the measured process")
+    parser.add_argument('--output', default=os.path.join(HERE, 'startup_report.jsonl'),
+                        help="JSON lines file the report is appended to")
+    args = parser.parse_args(argv)
+
+    load_dotenv(os.path.join(HERE, '.env'))
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'imports': import_breakdown(args.top),
+        'startup': time_to_healthy(args.timeout, args.warmup_mode)
+    }
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(report) + '\n')
+
+    imports, startup = report['imports'], report['startup']
+    print(f"import backend: {imports['backend_import_ms']} ms ({imports['modules_imported']} modules)")
+    for module in imports['top_direct_imports']:
+        print(f"  {module['cumulative_ms']:>9.1f} ms  {module['module']}")
+    print(f"first response: {startup['first_response_ms']} ms, "
+          f"first healthy response: {startup['first_healthy_ms']} ms (last status {startup['last_status']})")
+    print(f"report appended to {args.output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import numpy as np
+
+from hotspot_service import HotspotEngine, HotspotWorker
+
+
+class FakeCrimesTable:
+    """In-memory stand-in for crimes_data and the counters its trigger maintains."""
+
+    def __init__(self, rows):
+        self.rows = {crime_id: (category, lng, lat) for crime_id, category, lng, lat in rows}
+        self.version = 1
+        self.mutations = 0
+
+    def insert(self, crime_id, category, lng, lat):
+        self.rows[crime_id] = (category, lng, lat)
+        self.version += 1
+
+    def update(self, crime_id, category, lng, lat):
+        self.rows[crime_id] = (category, lng, lat)
+        self.version += 1
+        self.mutations += 1
+
+    def delete(self, crime_id):
+        del self.rows[crime_id]
+        self.version += 1
+        self.mutations += 1
+
+    def load(self, min_id=None):
+        return [(crime_id, *values) for crime_id, values in sorted(self.rows.items())
+                if min_id is None or crime_id > min_id]
+
+    def worker(self):
+        engine = HotspotEngine(cell_size_m=100, bandwidth_m=100, eps_m=100, min_points=1,
+                               bounds=(-122.45, 37.75, -122.40, 37.80))
+        return HotspotWorker(engine, get_version=lambda: str(self.version), load_all=self.load,
+                             load_since=self.load, count_rows=lambda: len(self.rows),
+                             get_mutation_count=lambda: self.mutations)
+
+
+def _count(worker, category):
+    surface = worker.engine.surfaces.get(category)
+    return 0 if surface is None else int(np.sum(surface.counts))
+
+
+def test_update_triggers_full_build():
+    table = FakeCrimesTable([
+        (1, 'A', -122.42, 37.77),
+        (2, 'A', -122.42, 37.77),
+        (3, 'B', -122.43, 37.78)
+    ])
+    worker = table.worker()
+    worker.refresh()
+    assert (_count(worker, 'A'), _count(worker, 'B')) == (2, 1)
+
+    # UPDATE: same ids, same row count, new version
+    table.update(2, 'B', -122.42, 37.77)
+    worker.refresh()
+    assert (_count(worker, 'A'), _count(worker, 'B')) == (1, 2)
+    assert worker.engine.data_version == '2'
+
+
+def test_append_is_incremental():
+    table = FakeCrimesTable([(1, 'A', -122.42, 37.77), (2, 'B', -122.43, 37.78)])
+    worker = table.worker()
+    worker.refresh()
+    engine = worker.engine
+
+    table.insert(3, 'A', -122.42, 37.77)
+    table.insert(7, 'B', -122.43, 37.78)
+    worker.refresh()
+    assert worker.engine is engine
+    assert (_count(worker, 'A'), _count(worker, 'B')) == (2, 2)
+    assert worker.engine.max_id == 7
+
+
+def test_append_swaps_in_complete_surfaces():
+    table = FakeCrimesTable([(1, 'A', -122.42, 37.77)])
+    worker = table.worker()
+    worker.refresh()
+    surfaces = worker.engine.surfaces
+
+    table.insert(2, 'C', -122.43, 37.78)
+    worker.refresh()
+    # The mapping readers held is left untouched; the new category arrives fully computed
+    assert 'C' not in surfaces
+    assert worker.engine.surfaces['C'].density is not None
+    assert worker.engine.query('C', None)['max_density'] > 0
+
+
+def test_update_alongside_contiguous_append_triggers_full_build():
+    table = FakeCrimesTable([(1, 'A', -122.42, 37.77), (2, 'A', -122.43, 37.78)])
+    worker = table.worker()
+    worker.refresh()
+    engine = worker.engine
+
+    # Both land in the same refresh window; the new id is contiguous with the old ones
+    table.update(2, 'B', -122.43, 37.78)
+    table.insert(3, 'A', -122.42, 37.77)
+    worker.refresh()
+    assert worker.engine is not engine
+    assert (_count(worker, 'A'), _count(worker, 'B')) == (2, 1)
+
+
+def test_delete_alongside_append_triggers_full_build():
+    table = FakeCrimesTable([(1, 'A', -122.42, 37.77), (2, 'B', -122.43, 37.78)])
+    worker = table.worker()
+    worker.refresh()
+
+    table.delete(2)
+    table.insert(3, 'A', -122.42, 37.77)
+    worker.refresh()
+    assert (_count(worker, 'A'), _count(worker, 'B')) == (2, 0)
+
+
+def test_outliers_do_not_stretch_the_grid():
+    rng = np.random.default_rng(0)
+    rows = [(i, 'A', -122.42 + rng.normal() * 0.01, 37.77 + rng.normal() * 0.01) for i in range(1, 5001)]
+    rows.append((5001, 'A', -120.5, 90.0))
+    engine = HotspotEngine(cell_size_m=100, bandwidth_m=100, eps_m=100, min_points=5)
+    engine.full_build(rows, '1')
+    assert engine.grid.width * engine.grid.height < 10000
+    assert engine.max_id == 5001
+
+
+def test_failed_build_is_reported_and_not_retried_for_the_same_version():
+    table = FakeCrimesTable([(1, 'A', -122.42, 37.77)])
+    worker = table.worker()
+    worker.engine.max_grid_cells = 1
+    try:
+        worker.refresh()
+    except ValueError:
+        pass
+    assert not worker.ready
+    assert 'exceeds the limit' in worker.last_error
+
+    worker.engine.max_grid_cells = 10 ** 7
+    worker.refresh()
+    assert not worker.ready
+
+    table.insert(2, 'A', -122.42, 37.77)
+    worker.refresh()
+    assert worker.ready and worker.last_error is None
+
+
+def test_empty_table_is_reported():
+    worker = FakeCrimesTable([]).worker()
+    worker.refresh()
+    assert not worker.ready
+    assert worker.last_error == "No incidents available for hotspot computation"
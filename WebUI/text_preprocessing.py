@@ -0,0 +1,40 @@
+import re
+from typing import Iterable, List
+
+# NLTK resources are loaded lazily and once per process, so worker processes
+# and the serving process only pay for them on first use
+_stop_words = None
+_lemmatizer = None
+
+
+def _resources():
+    global _stop_words, _lemmatizer
+    if _stop_words is None:
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        _stop_words = set(stopwords.words('english'))
+        _lemmatizer = WordNetLemmatizer()
+    return _stop_words, _lemmatizer
+
+
+def preprocess_text(text: str) -> str:
+    """
+    Normalise a crime description the same way the category model was trained.
+
+    Lowercases, strips non-letters, tokenizes, removes English stopwords and
+    lemmatizes the remaining tokens.
+    """
+    if not isinstance(text, str):
+        return ""
+
+    from nltk.tokenize import word_tokenize
+    stop_words, lemmatizer = _resources()
+
+    text = re.sub(r'[^a-zA-Z\s]', '', text.lower())
+    tokens = word_tokenize(text)
+    return " ".join(lemmatizer.lemmatize(token) for token in tokens if token not in stop_words)
+
+
+def preprocess_batch(texts: Iterable[str]) -> List[str]:
+    """Preprocess a batch of descriptions; picklable so it can run in worker processes or a pipeline step."""
+    return [preprocess_text(text) for text in texts]
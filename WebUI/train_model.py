@@ -0,0 +1,382 @@
+"""
+Reproducible training pipeline for the crime category model.
+
+Produces the artifact loaded by model_service.CrimeCategoryPredictor together
+with a JSON file of training-time and accuracy metrics.
+
+Examples:
+    # In-memory TF-IDF + MultinomialNB with a parallel grid search (notebook setup)
+    python train_model.py --source csv --csv "../Level 1&2/crimes_data.csv"
+
+    # Out-of-core HashingVectorizer + partial_fit, streaming from the database
+    python train_model.py --source db --mode hashing --chunk-size 100000
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from dotenv import load_dotenv
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+from text_preprocessing import preprocess_batch
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CSV_TEXT_COLUMN = 'Descript'
+CSV_LABEL_COLUMN = 'Category'
+
+
+# ---------------------------------------------------------------------------
+# Data sources
+# ---------------------------------------------------------------------------
+
+def _database_engine():
+    from sqlalchemy import create_engine
+    load_dotenv()
+    return create_engine(
+        f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:"
+        f"{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+    )
+
+
+def _database_frames(chunk_size: int) -> Iterator[Tuple[pd.Series, pd.Series]]:
+    # Server-side cursor so the table is never materialised client-side
+    with _database_engine().connect() as connection:
+        connection = connection.execution_options(stream_results=True)
+        reader = pd.read_sql(
+            "SELECT description, category FROM crimes_data WHERE category IS NOT NULL ORDER BY id",
+            connection, chunksize=chunk_size
+        )
+        for chunk in reader:
+            yield chunk['description'], chunk['category']
+
+
+def iter_chunks(args) -> Iterator[Tuple[List[str], List[str]]]:
+    """Yield (descriptions, categories) chunks from the CSV file or the crimes_data table."""
+    rows_seen = 0
+    if args.source == 'csv':
+        reader = pd.read_csv(args.csv, usecols=[CSV_TEXT_COLUMN, CSV_LABEL_COLUMN], chunksize=args.chunk_size)
+        frames = ((chunk[CSV_TEXT_COLUMN], chunk[CSV_LABEL_COLUMN]) for chunk in reader)
+    else:
+        frames = _database_frames(args.chunk_size)
+
+    for texts, labels in frames:
+        mask = labels.notna()
+        texts = texts[mask].fillna('').astype(str).tolist()
+        labels = labels[mask].astype(str).tolist()
+        if args.limit:
+            remaining = args.limit - rows_seen
+            if remaining <= 0:
+                return
+            texts, labels = texts[:remaining], labels[:remaining]
+        rows_seen += len(texts)
+        yield texts, labels
+
+
+def collect_classes(args) -> List[str]:
+    """Collect the label set up front; partial_fit needs every class on its first call."""
+    if args.source == 'csv':
+        classes = set()
+        for chunk in pd.read_csv(args.csv, usecols=[CSV_LABEL_COLUMN], chunksize=args.chunk_size):
+            classes.update(chunk[CSV_LABEL_COLUMN].dropna().astype(str).unique())
+        return sorted(classes)
+    with _database_engine().connect() as connection:
+        rows = connection.exec_driver_sql(
+            "SELECT DISTINCT category FROM crimes_data WHERE category IS NOT NULL"
+        ).fetchall()
+    return sorted(str(row[0]) for row in rows)
+
+
+def preprocess_parallel(executor: ProcessPoolExecutor, texts: List[str], workers: int) -> List[str]:
+    """Run NLTK preprocessing for a chunk across worker processes."""
+    if workers <= 1 or len(texts) < 1000:
+        return preprocess_batch(texts)
+    batch_size = int(np.ceil(len(texts) / (workers * 4)))
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    processed = []
+    for result in executor.map(preprocess_batch, batches):
+        processed.extend(result)
+    return processed
+
+
+# ---------------------------------------------------------------------------
+# Training modes
+# ---------------------------------------------------------------------------
+
+def train_tfidf(args, executor, timings: Dict[str, float]) -> Tuple[Pipeline, Dict[str, Any]]:
+    """Notebook setup: TF-IDF + MultinomialNB, tuned with a parallel GridSearchCV."""
+    started = time.perf_counter()
+    texts, labels = [], []
+    for chunk_texts, chunk_labels in iter_chunks(args):
+        texts.extend(preprocess_parallel(executor, chunk_texts, args.workers))
+        labels.extend(chunk_labels)
+    timings['load_and_preprocess_seconds'] = time.perf_counter() - started
+    logger.info(f"Loaded and preprocessed {len(texts)} rows in {timings['load_and_preprocess_seconds']:.1f}s")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=args.test_size, random_state=args.seed, stratify=labels
+    )
+
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer(stop_words='english', ngram_range=(1, 2), max_features=5000)),
+        ('classifier', MultinomialNB())
+    ])
+    param_grid = {
+        'tfidf__max_features': args.max_features,
+        'tfidf__ngram_range': [(1, 1), (1, 2)],
+        'classifier__alpha': args.alphas
+    }
+
+    started = time.perf_counter()
+    search = GridSearchCV(pipeline, param_grid, cv=args.cv, n_jobs=args.workers, verbose=1)
+    search.fit(X_train, y_train)
+    timings['search_seconds'] = time.perf_counter() - started
+    logger.info(f"Best parameters: {search.best_params_} ({timings['search_seconds']:.1f}s)")
+
+    started = time.perf_counter()
+    best_model = search.best_estimator_
+    y_pred = best_model.predict(X_test)
+    timings['evaluate_seconds'] = time.perf_counter() - started
+
+    metrics = {
+        'best_params': {key: list(value) if isinstance(value, tuple) else value
+                        for key, value in search.best_params_.items()},
+        'cv_best_score': float(search.best_score_),
+        'train_rows': len(X_train),
+        'test_rows': len(X_test),
+        'accuracy': float(accuracy_score(y_test, y_pred)),
+        'classification_report': classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+    }
+    return best_model, metrics
+
+
+def train_hashing(args, executor, timings: Dict[str, float]) -> Tuple[Pipeline, Dict[str, Any]]:
+    """
+    Out-of-core mode: HashingVectorizer + MultinomialNB.partial_fit over streamed chunks.
+
+    Every hyperparameter combination is trained in the same pass; chunks are
+    vectorised once per n_features setting and the candidate models are updated
+    in parallel threads. A bounded holdout sample is reservoir-sampled over the
+    whole stream; one part of it selects the hyperparameters and the other,
+    disjoint part gives the reported accuracy.
+    """
+    from joblib import Parallel, delayed
+
+    started = time.perf_counter()
+    classes = collect_classes(args)
+    timings['collect_classes_seconds'] = time.perf_counter() - started
+    logger.info(f"Found {len(classes)} categories")
+
+    vectorizers = {
+        n_features: HashingVectorizer(
+            n_features=n_features, ngram_range=(1, 2), stop_words='english', alternate_sign=False
+        )
+        for n_features in args.hash_features
+    }
+    candidates = {
+        (n_features, alpha): MultinomialNB(alpha=alpha)
+        for n_features, alpha in product(args.hash_features, args.alphas)
+    }
+
+    rng = np.random.RandomState(args.seed)
+    holdout_texts, holdout_labels = [], []
+    holdout_seen = 0
+    train_rows = 0
+    preprocess_seconds = 0.0
+    fit_seconds = 0.0
+    first_chunk = True
+
+    with Parallel(n_jobs=args.workers, prefer='threads') as parallel:
+        for chunk_texts, chunk_labels in iter_chunks(args):
+            chunk_started = time.perf_counter()
+            processed = preprocess_parallel(executor, chunk_texts, args.workers)
+            preprocess_seconds += time.perf_counter() - chunk_started
+
+            # Hold out a random sample, bounded so evaluation stays in memory. Rows
+            # drawn for it go through a reservoir (Algorithm R), so the bounded
+            # holdout is uniform over the whole stream rather than its first rows;
+            # whatever the reservoir rejects or evicts is trained on instead.
+            is_holdout = rng.random_sample(len(processed)) < args.test_size
+            train_texts, train_labels = [], []
+            for text, label, holdout in zip(processed, chunk_labels, is_holdout):
+                if not holdout:
+                    train_texts.append(text)
+                    train_labels.append(label)
+                    continue
+                holdout_seen += 1
+                if len(holdout_texts) < args.max_eval_rows:
+                    holdout_texts.append(text)
+                    holdout_labels.append(label)
+                    continue
+                slot = rng.randint(holdout_seen)
+                if slot < args.max_eval_rows:
+                    text, holdout_texts[slot] = holdout_texts[slot], text
+                    label, holdout_labels[slot] = holdout_labels[slot], label
+                train_texts.append(text)
+                train_labels.append(label)
+            if not train_texts:
+                continue
+
+            fit_started = time.perf_counter()
+            matrices = dict(zip(vectorizers, parallel(
+                delayed(vectorizer.transform)(train_texts) for vectorizer in vectorizers.values()
+            )))
+            parallel(
+                delayed(model.partial_fit)(
+                    matrices[n_features], train_labels, classes=classes if first_chunk else None
+                )
+                for (n_features, _), model in candidates.items()
+            )
+            fit_seconds += time.perf_counter() - fit_started
+            first_chunk = False
+            train_rows += len(train_texts)
+            logger.info(f"Trained on {train_rows} rows so far")
+
+    if first_chunk:
+        raise RuntimeError("No training rows were read from the source")
+
+    timings['preprocess_seconds'] = preprocess_seconds
+    timings['fit_seconds'] = fit_seconds
+
+    if len(holdout_texts) < 2:
+        raise RuntimeError("Too few held-out rows to select and evaluate a model; raise --test-size")
+
+    # Select on one part of the holdout and report on the rest, so the reported
+    # accuracy is not the score the winner was picked for
+    started = time.perf_counter()
+    order = rng.permutation(len(holdout_texts))
+    selection_rows = min(len(order) - 1, max(1, int(round(len(order) * args.selection_size))))
+    selection_idx, test_idx = order[:selection_rows], order[selection_rows:]
+    selection_labels = [holdout_labels[i] for i in selection_idx]
+    test_labels = [holdout_labels[i] for i in test_idx]
+    selection_matrices = {n_features: vectorizer.transform([holdout_texts[i] for i in selection_idx])
+                          for n_features, vectorizer in vectorizers.items()}
+    scores = {
+        key: accuracy_score(selection_labels, model.predict(selection_matrices[key[0]]))
+        for key, model in candidates.items()
+    }
+    best_key = max(scores, key=scores.get)
+    best_features, best_alpha = best_key
+    y_pred = candidates[best_key].predict(vectorizers[best_features].transform([holdout_texts[i] for i in test_idx]))
+    accuracy = accuracy_score(test_labels, y_pred)
+    timings['evaluate_seconds'] = time.perf_counter() - started
+    logger.info(f"Best parameters: n_features={best_features}, alpha={best_alpha} "
+                f"(selection accuracy {scores[best_key]:.4f}, test accuracy {accuracy:.4f})")
+
+    best_model = Pipeline([
+        ('hashing', vectorizers[best_features]),
+        ('classifier', candidates[best_key])
+    ])
+    metrics = {
+        'best_params': {'hashing__n_features': best_features, 'classifier__alpha': best_alpha},
+        'candidate_scores': [
+            {'hashing__n_features': n_features, 'classifier__alpha': alpha, 'selection_accuracy': float(score)}
+            for (n_features, alpha), score in sorted(scores.items())
+        ],
+        'train_rows': train_rows,
+        'selection_rows': len(selection_idx),
+        'test_rows': len(test_idx),
+        'accuracy': float(accuracy),
+        'classification_report': classification_report(test_labels, y_pred, output_dict=True, zero_division=0)
+    }
+    return best_model, metrics
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Train the crime category prediction model.")
+    parser.add_argument('--source', choices=['csv', 'db'], default='csv',
+                        help="Read training data from a CSV file or the crimes_data table")
+    parser.add_argument('--csv', default=os.path.join('..', 'Level 1&2', 'crimes_data.csv'),
+                        help="CSV file with Descript and Category columns")
+    parser.add_argument('--mode', choices=['tfidf', 'hashing'], default='tfidf',
+                        help="tfidf: in-memory TF-IDF + grid search; hashing: out-of-core partial_fit")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Rows read per chunk")
+    parser.add_argument('--limit', type=int, default=None, help="Only use the first N rows")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processes for preprocessing and parallel jobs for the search")
+    parser.add_argument('--test-size', type=float, default=0.2, help="Fraction of rows held out for evaluation")
+    parser.add_argument('--max-eval-rows', type=int, default=200000,
+                        help="Upper bound on held-out rows kept in memory (hashing mode)")
+    parser.add_argument('--selection-size', type=float, default=0.5,
+                        help="Fraction of the holdout used to pick hyperparameters; the rest "
+                             "gives the reported accuracy (hashing mode)")
+    parser.add_argument('--cv', type=int, default=5, help="Cross-validation folds (tfidf mode)")
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.1, 0.5, 1.0],
+                        help="MultinomialNB smoothing values to search")
+    parser.add_argument('--max-features', type=int, nargs='+', default=[3000, 5000],
+                        help="TF-IDF vocabulary sizes to search (tfidf mode)")
+    parser.add_argument('--hash-features', type=int, nargs='+', default=[2 ** 18, 2 ** 20],
+                        help="HashingVectorizer widths to search (hashing mode)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for splits")
+    parser.add_argument('--output', default='crime_category_prediction_model.pkl',
+                        help="Where to write the model artifact")
+    parser.add_argument('--metrics', default=None,
+                        help="Where to write the metrics JSON (default: <output>.metrics.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    args.workers = max(1, args.workers)
+    metrics_path = args.metrics or f"{os.path.splitext(args.output)[0]}.metrics.json"
+
+    logger.info(f"Training in {args.mode} mode from {args.source} with {args.workers} workers")
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        if args.mode == 'tfidf':
+            model, metrics = train_tfidf(args, executor, timings)
+        else:
+            model, metrics = train_hashing(args, executor, timings)
+
+    # Serving passes raw descriptions, so the same preprocessing runs as the first pipeline step
+    artifact = Pipeline([('preprocess', FunctionTransformer(preprocess_batch))] + model.steps)
+
+    started_save = time.perf_counter()
+    joblib.dump(artifact, args.output)
+    timings['save_seconds'] = time.perf_counter() - started_save
+    timings['total_seconds'] = time.perf_counter() - started
+
+    metrics.update({
+        'mode': args.mode,
+        'source': args.source,
+        'workers': args.workers,
+        'chunk_size': args.chunk_size,
+        'seed': args.seed,
+        'classes': [str(label) for label in artifact.classes_],
+        'sklearn_version': sklearn.__version__,
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'artifact': os.path.abspath(args.output),
+        'timings': {key: round(value, 3) for key, value in timings.items()}
+    })
+    with open(metrics_path, 'w') as f:
+        json.dump(metrics, f, indent=2)
+
+    logger.info(f"Saved model to {args.output} (accuracy {metrics['accuracy']:.4f}, "
+                f"{timings['total_seconds']:.1f}s total); metrics written to {metrics_path}")
+    return metrics
+
+
+if __name__ == '__main__':
+    main()